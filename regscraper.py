@@ -4,14 +4,24 @@ Scrapes administrative rules organized by department instead of title.
 """
 
 import argparse
+import asyncio
+import gzip
+import hashlib
+import heapq
 import json
+import mmap
 import os
 import queue
+import random
 import re
+import shutil
 import threading
 import time
-from io import TextIOWrapper
-from typing import Optional
+from functools import lru_cache, partial
+from itertools import chain, dropwhile, islice
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Optional
 
 try:
     import cloudscraper
@@ -22,15 +32,52 @@ except ImportError:
     print("WARNING: cloudscraper not installed. Install it with: pip install cloudscraper")
     print("WARNING: Falling back to requests (may not work with Cloudflare protection)\n")
 
-from bs4 import BeautifulSoup, PageElement
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_not_result,
-    retry_if_exception_type,
-)
-from tqdm import tqdm
+try:
+    import lxml  # noqa: F401  (only needed as a BeautifulSoup tree builder)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+    print("WARNING: lxml not installed. Install it with: pip install lxml")
+    print("WARNING: Falling back to html.parser (much slower HTML parsing)\n")
+
+try:
+    import orjson
+    USE_ORJSON = True
+except ImportError:
+    USE_ORJSON = False
+
+# httpx is optional and only used with --http2
+try:
+    import httpx
+    USE_HTTPX = True
+except ImportError:
+    USE_HTTPX = False
+
+# h2 is httpx's HTTP/2 support (the httpx[http2] extra); without it httpx only speaks HTTP/1.1
+try:
+    import h2  # noqa: F401  (only needed by httpx clients created with http2=True)
+    USE_H2 = True
+except ImportError:
+    USE_H2 = False
+
+# aiohttp is optional and only used with --async
+try:
+    import aiohttp
+    USE_AIOHTTP = True
+except ImportError:
+    USE_AIOHTTP = False
+
+# selectolax is an optional fast path for listing pages; BeautifulSoup is used without it
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    USE_SELECTOLAX = True
+except ImportError:
+    USE_SELECTOLAX = False
+
+from bs4 import BeautifulSoup, PageElement, SoupStrainer, Tag
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from tqdm.auto import tqdm
 
 
 # ============================================================================
@@ -47,7 +94,8 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.9",
-    "Accept-Encoding": "gzip, deflate, br",
+    # Only advertise encodings urllib3 can decode here (br needs brotli installed)
+    "Accept-Encoding": ACCEPT_ENCODING,
     "Connection": "keep-alive",
     "Upgrade-Insecure-Requests": "1",
     "Sec-Fetch-Dest": "document",
@@ -57,8 +105,75 @@ HEADERS = {
     "Cache-Control": "max-age=0"
 }
 
+# Connection pooling for the shared HTTP session. Every request goes to the same
+# couple of Justia hosts, so keeping connections alive saves a TLS handshake per page.
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 64
+
+# On-disk page cache (enabled with --cache)
+CACHE_DIR = ".justia_cache"
+CACHE_EXPIRE_AFTER = 7 * 86400  # seconds
+
+# Scraped records go to regs/{STATE}.jsonl, or regs/{STATE}.jsonl.gz with --gzip
+SAVE_DIR = "regs"
+OUTPUT_COMPRESSLEVEL = 3  # gzip level; higher levels cost CPU for little size gain on text
+# Each thread writes its department to its own part file, merged into the output in order
+PART_BUFFER_SIZE = 1 << 20  # bytes
+
+# Breadcrumb separator used on Justia pages (U+203A)
+_SEP = "\u203a"
+# Every page of a state starts its breadcrumbs with the same segments before the state
+# code ("Justia", "U.S. Law", "U.S. Regulations"); cached per state after the first page
+_STATE_BREADCRUMB_PREFIX: dict[str, tuple[str, ...]] = {}
+
+# Precompiled patterns
+# "(RESERVED)" is covered by the bare RESERVED match.
+_RESERVED_RE = re.compile(r"\(REPEALED\)|RESERVED", re.IGNORECASE)
+# Footer/promotional text Justia embeds in main-content (case-sensitive, like the
+# substring checks it replaces)
+JUNK_KEYWORDS = (
+    "Disclaimer", "reCAPTCHA", "Free Daily Summaries", "Newsletter",
+    "Sign Up", "Enter Your Email", "Ask a Lawyer", "Find a Lawyer",
+    "Get Listed", "Justia Legal Resources", "Justia Connect",
+    "Privacy Policy", "Terms of Service", "Google", "CLE Credits",
+    "Webinars", "Toggle button", "Lawyers - Get Listed",
+    "Get free summaries", "Free Answers", "Our Suggestions"
+)
+_JUNK_RE = re.compile("|".join(map(re.escape, JUNK_KEYWORDS)))
+# Whitespace cleanup for extracted text. \s is Unicode-aware, so non-breaking spaces
+# are stripped from line ends just like str.strip() does.
+_BLANK_LINES_RE = re.compile(r"\s*\n\s*\n\s*")  # a break with at least one blank line
+_LINE_WS_RE = re.compile(r"[^\S\n]*\n[^\S\n]*")  # whitespace around a single line break
+# Page chrome that never belongs in regulation text
+_CHROME_TAGS = ("header", "footer", "nav", "script", "style", "noscript")
+
+# Upper bound on the exponential backoff between retries, in seconds
+MAX_BACKOFF = 30
+
+# Default request rate per thread when --rps is not given (the old fixed 0.1s
+# pause before every request), and the random jitter added to throttled waits
+# as a fraction of the token interval
+DEFAULT_RPS_PER_THREAD = 10
+RATE_LIMIT_JITTER = 0.1
+# The limit adapts to the server: the rate is halved on a 429/503 (at most once per
+# cooldown, since concurrent workers are throttled together) and raised by 10% after
+# a run of successful requests, back up to the configured rate
+RATE_DECREASE_FACTOR = 0.5
+RATE_DECREASE_COOLDOWN = 1.0  # seconds
+RATE_INCREASE_FACTOR = 1.1
+RATE_INCREASE_AFTER = 50  # consecutive successes
+MIN_RPS = 0.5
+
+# Limits for the asyncio crawler (--async); --threads overrides the per-host limit
+ASYNC_LIMIT_PER_HOST = 16  # open connections per host
+ASYNC_REQUESTS_PER_CONNECTION = 4  # in-flight requests allowed per connection
+ASYNC_CONCURRENCY = ASYNC_LIMIT_PER_HOST * ASYNC_REQUESTS_PER_CONNECTION
+# Pages held between fetch and parse, per allowed in-flight request; above 1 so retry
+# back-off and the parse queue don't leave the fetch slots idle
+ASYNC_PAGES_PER_REQUEST = 2
+
 # State URL mappings
-JUR_URL_MAP = {
+JUR_URL_MAP = MappingProxyType({
     "AL": "alabama",
     "AK": "alaska",
     "AZ": "arizona",
@@ -115,7 +230,13 @@ JUR_URL_MAP = {
     "MP": "northern-mariana-islands",
     "PR": "puerto-rico",
     "VI": "us-virgin-islands",
-}
+})
+
+# Reverse lookup: URL slug -> state abbreviation
+JUR_BY_SLUG = MappingProxyType({slug: abb for abb, slug in JUR_URL_MAP.items()})
+
+# Valid state abbreviations, for membership tests
+_STATE_CODES: frozenset[str] = frozenset(JUR_URL_MAP)
 
 
 # ============================================================================
@@ -128,6 +249,315 @@ def _is_good_response(response):
     return response is not None and response.status_code == 200
 
 
+def _is_retryable_status(status_code: int) -> bool:
+    """Check if a status code is transient (rate limited or server error) and worth retrying."""
+    return status_code == 429 or status_code >= 500
+
+
+def parse_state(value: str) -> str:
+    """
+    Normalize a state given on the command line to its abbreviation.
+
+    Accepts an abbreviation in any case (e.g. "mt") or a URL slug (e.g. "montana").
+
+    Args:
+        value (str): The user-supplied state
+
+    Returns:
+        str: The upper-case state abbreviation
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a known state
+    """
+    value = value.strip()
+    state_abb = JUR_BY_SLUG.get(value.lower(), value.upper())
+    if state_abb not in _STATE_CODES:
+        raise argparse.ArgumentTypeError(
+            f"unknown state '{value}' (choose from {', '.join(JUR_URL_MAP)})"
+        )
+    return state_abb
+
+
+def _resize_pool(adapter: HTTPAdapter, pool_connections: int, pool_maxsize: int) -> None:
+    """Rebuild an adapter's pool manager in place so custom adapters (e.g. cloudscraper's TLS adapter) are kept."""
+    adapter._pool_connections = pool_connections
+    adapter._pool_maxsize = pool_maxsize
+    adapter.init_poolmanager(pool_connections, pool_maxsize, block=adapter._pool_block)
+
+
+def create_session(pool_maxsize: int = POOL_MAXSIZE, http2: bool = False):
+    """
+    Create an HTTP session with a keep-alive connection pool.
+
+    Args:
+        pool_maxsize (int): Maximum number of pooled connections per host; should be
+            at least the number of threads sharing the session
+        http2 (bool): Use an httpx client that multiplexes requests over HTTP/2
+            (requires httpx[http2]; does not solve Cloudflare challenges)
+
+    Returns:
+        cloudscraper.CloudScraper, requests.Session or httpx.Client: The configured session
+    """
+    if http2:
+        return httpx.Client(
+            http2=True,
+            headers=HEADERS,
+            limits=httpx.Limits(max_keepalive_connections=POOL_CONNECTIONS, max_connections=pool_maxsize),
+            timeout=30,
+            follow_redirects=True,
+        )
+    if USE_CLOUDSCRAPER:
+        session = cloudscraper.create_scraper(
+            browser={
+                'browser': 'chrome',
+                'platform': 'darwin',
+                'desktop': True,
+                # Pin a desktop profile so every request presents the same browser identity
+                'mobile': False,
+            }
+        )
+        # cloudscraper keeps its browser profile's headers, but advertises br even without brotli
+        # to decode it; take the transport headers from HEADERS so responses stay compressed
+        # and decodable over kept-alive connections
+        session.headers.update({key: HEADERS[key] for key in ("Accept-Encoding", "Connection")})
+        # cloudscraper mounts its own cipher-suite adapter for Cloudflare; resize it rather than replace it.
+        # The plain http:// adapter is resized too, for links that redirect through http.
+        for prefix in ("https://", "http://"):
+            _resize_pool(session.get_adapter(prefix), POOL_CONNECTIONS, pool_maxsize)
+    else:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        # Retries are handled by fetch_with_retry, so the adapters never retry on their own
+        for prefix in ("https://", "http://"):
+            session.mount(
+                prefix,
+                HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=0),
+            )
+    return session
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session(pool_maxsize: int = POOL_MAXSIZE, http2: bool = False):
+    """
+    Return the shared module-level session, creating it on first use.
+
+    Args:
+        pool_maxsize (int): Pool size to use if the session has not been created yet
+        http2 (bool): Create an HTTP/2 httpx client if the session has not been created yet
+
+    Returns:
+        cloudscraper.CloudScraper, requests.Session or httpx.Client: The shared session
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = create_session(pool_maxsize, http2=http2)
+        return _SESSION
+
+
+def close_session() -> None:
+    """Close the shared session and release its pooled connections."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+class PageCache:
+    """
+    On-disk cache of fetched pages, keyed by URL and stored gzip-compressed.
+
+    Entries older than expire_after seconds are refetched. The ETag/Last-Modified
+    validators of each page are kept in a small sidecar file so an expired entry can
+    be revalidated with a conditional GET (a 304 reply carries no body), and an
+    expired body can still be served if the refetch fails.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, expire_after: float = CACHE_EXPIRE_AFTER):
+        self.cache_dir = cache_dir
+        self.expire_after = expire_after
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        # Fan out into subdirectories so no single directory holds every page
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.html.gz")
+
+    def _meta_path(self, url: str) -> str:
+        return self._path(url)[: -len(".html.gz")] + ".meta.json"
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[bytes]:
+        """Return the cached page body for url, or None if missing (or expired, unless allow_stale)."""
+        path = self._path(url)
+        try:
+            if not allow_stale and time.time() - os.path.getmtime(path) > self.expire_after:
+                return None
+            with gzip.open(path, "rb") as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def validators(self, url: str) -> dict:
+        """Return If-None-Match/If-Modified-Since headers for revalidating url (empty if unknown)."""
+        try:
+            with open(self._meta_path(url), "rb") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def touch(self, url: str) -> None:
+        """Mark the entry for url fresh again after the server confirmed it is unchanged."""
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+
+    def set(self, url: str, content: bytes, headers=None) -> None:
+        """Store a page body for url, with its validators from the response headers if given."""
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a per-thread temp file and rename so readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=3) as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        meta_path = self._meta_path(url)
+        meta = {}
+        if headers is not None:
+            meta = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+        if not any(meta.values()):
+            # Drop validators that belonged to an older copy of the page
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+            return
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response for pages served from the PageCache."""
+
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, url: str, content: bytes):
+        self.url = url
+        self.content = content
+        self.headers = {}
+
+
+_PAGE_CACHE: Optional[PageCache] = None
+
+
+def _cache_page(url: str, content: bytes, headers=None) -> None:
+    """Save a fetched page to the page cache; a failed write (e.g. a full disk) only warns."""
+    try:
+        _PAGE_CACHE.set(url, content, headers)
+    except OSError as e:
+        print(f"WARNING: Could not cache {url}: {e}")
+
+
+def enable_page_cache(cache_dir: str = CACHE_DIR, expire_after: float = CACHE_EXPIRE_AFTER) -> None:
+    """
+    Serve fetch_with_retry from an on-disk cache, storing every successful page.
+
+    Args:
+        cache_dir (str): Directory for cached pages (default: .justia_cache)
+        expire_after (float): Maximum age of a cached page in seconds (default: 7 days)
+    """
+    global _PAGE_CACHE
+    _PAGE_CACHE = PageCache(cache_dir, expire_after)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that caps the request rate shared by all workers.
+
+    Tokens refill at `rate` per second up to `capacity`, which allows short bursts.
+    Callers that find the bucket empty reserve a future token and wait for it, so
+    waiting requests are spread out evenly instead of retrying all at once. A little
+    random jitter is added to each wait so throttled workers don't fire in lockstep.
+
+    The rate adapts to the server's responses (see feedback): it drops when the
+    server pushes back and climbs back to `max_rate` while requests succeed.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, jitter: float = RATE_LIMIT_JITTER):
+        self.rate = rate
+        self.max_rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.jitter = jitter
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._successes = 0
+        self._decreased = float("-inf")
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            wait = -self._tokens / self.rate
+        return wait + random.uniform(0, self.jitter / self.rate)
+
+    def acquire(self) -> None:
+        """Block until a token is available."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def feedback(self, status_code: int) -> None:
+        """Adjust the rate to a response: back off on 429/503, speed up after a run of successes."""
+        with self._lock:
+            if status_code in (429, 503):
+                self._successes = 0
+                now = time.monotonic()
+                if now - self._decreased >= RATE_DECREASE_COOLDOWN:
+                    self._decreased = now
+                    self.rate = max(MIN_RPS, self.rate * RATE_DECREASE_FACTOR)
+                    # Drop saved-up tokens so the slower rate isn't undone by a burst
+                    self._tokens = min(self._tokens, 0.0)
+            elif status_code in (200, 304):
+                self._successes += 1
+                if self._successes >= RATE_INCREASE_AFTER and self.rate < self.max_rate:
+                    self._successes = 0
+                    self.rate = min(self.max_rate, self.rate * RATE_INCREASE_FACTOR)
+
+
+_RATE_LIMITER: Optional[TokenBucket] = None
+
+
+def set_rate_limit(rps: Optional[float]) -> None:
+    """
+    Limit all fetches (threads and async) to a shared number of requests per second.
+
+    Args:
+        rps (float | None): Requests per second, or None to disable the limit
+    """
+    global _RATE_LIMITER
+    _RATE_LIMITER = TokenBucket(rps) if rps else None
+
+
 def is_reserved_or_repealed(text: str) -> bool:
     """
     Check if a section is RESERVED or REPEALED and should be skipped.
@@ -138,52 +568,91 @@ def is_reserved_or_repealed(text: str) -> bool:
     Returns:
         bool: True if the text contains RESERVED or REPEALED markers
     """
-    text_upper = text.upper()
-    return "(REPEALED)" in text_upper or "(RESERVED)" in text_upper or "RESERVED" in text_upper
+    return _RESERVED_RE.search(text) is not None
+
+
+def is_malformed_href(href: str) -> bool:
+    """
+    Check if a link is malformed (double slashes, empty paths, circular references).
+
+    Following these causes infinite recursion loops.
+
+    Args:
+        href (str): The link's href
+
+    Returns:
+        bool: True if the link should be skipped
+    """
+    # Most hrefs are plain relative paths; only those with a "//" need the full checks
+    return "//" in href and (href.endswith("//") or "//" in href.replace("://", ""))
 
 
-def fetch_with_retry(url: str, max_retries: int = 3, delay: float = 1.0, request_delay: float = 0.1, scraper=None):
+def _retry_wait(attempt: int, delay: float, retry_after: Optional[str] = None) -> float:
     """
-    Fetch a URL with exponential backoff retry logic using Tenacity.
+    Seconds to wait before retrying a failed request.
+
+    A 429's Retry-After replaces the backoff instead of being added to it. Otherwise the
+    wait doubles per attempt up to MAX_BACKOFF, plus up to `delay` seconds of random jitter
+    so workers that failed together don't all retry at the same moment.
+
+    Args:
+        attempt (int): The attempt that just failed (0 for the first)
+        delay (float): Initial delay between retries in seconds
+        retry_after (str | None): The Retry-After header of a 429 response, if any
+
+    Returns:
+        float: Seconds to sleep
+    """
+    if retry_after:
+        try:
+            wait_time = int(retry_after)
+            print(f"Rate limited. Waiting {wait_time}s as requested by server...")
+        except ValueError:
+            wait_time = 60
+            print("Rate limited. Waiting 60s...")
+        return wait_time
+    return min(MAX_BACKOFF, delay * 2 ** attempt + random.uniform(0, delay))
+
+
+def fetch_with_retry(url: str, max_retries: int = 3, delay: float = 1.0, scraper=None):
+    """
+    Fetch a URL, retrying errors, 429s and 5xx responses with exponential backoff.
 
     Args:
         url (str): The URL to fetch
         max_retries (int): Maximum number of retry attempts (default: 3)
         delay (float): Initial delay between retries in seconds (default: 1.0)
-        request_delay (float): Delay before each request in seconds (default: 1.0)
-        scraper: Optional cloudscraper instance to reuse
+        scraper: Optional session to use instead of the shared module-level session
 
     Returns:
-        requests.Response or None: Response object if successful, None if all retries failed
+        requests.Response or None: The final response (check its status code), or None
+            if every attempt failed without a response. With the page cache enabled, a
+            CachedResponse is returned for fresh hits, 304 replies, and (stale) when
+            every attempt failed
     """
-    # Create scraper instance if not provided
+    # Serve from the on-disk cache when enabled; expired entries are revalidated below
+    conditional_headers = None
+    if _PAGE_CACHE is not None:
+        cached_content = _PAGE_CACHE.get(url)
+        if cached_content is not None:
+            return CachedResponse(url, cached_content)
+        conditional_headers = _PAGE_CACHE.validators(url) or None
+
+    # Fall back to the shared pooled session so connections are reused across calls
     if scraper is None:
-        if USE_CLOUDSCRAPER:
-            scraper = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'darwin',
-                    'desktop': True
-                }
-            )
-        else:
-            scraper = requests.Session()
-            scraper.headers.update(HEADERS)
-
-    @retry(
-        stop=stop_after_attempt(max_retries + 1),
-        wait=wait_exponential(multiplier=delay, min=delay, max=60),
-        retry=retry_if_not_result(_is_good_response),
-        reraise=False,
-    )
+        scraper = get_session()
+
     def _fetch():
         try:
-            # Add a small delay before each request to avoid rate limiting
-            time.sleep(request_delay)
-            response = scraper.get(url, timeout=30)
-
-            # Print all non-200 status codes
-            if response.status_code != 200:
+            # Pace requests with the shared rate limiter to avoid being rate limited
+            if _RATE_LIMITER is not None:
+                _RATE_LIMITER.acquire()
+            response = scraper.get(url, timeout=30, headers=conditional_headers)
+            if _RATE_LIMITER is not None:
+                _RATE_LIMITER.feedback(response.status_code)
+
+            # Print all non-200 status codes (304 answers our conditional GET)
+            if response.status_code not in (200, 304):
                 error_msg = f"HTTP {response.status_code} error for {url}"
                 if response.status_code == 403:
                     error_msg += " - FORBIDDEN: Access denied"
@@ -197,283 +666,906 @@ def fetch_with_retry(url: str, max_retries: int = 3, delay: float = 1.0, request
                     error_msg += " - SERVICE UNAVAILABLE: Server temporarily unavailable"
                 print(error_msg)
 
-            # Handle Retry-After header for 429 rate limiting
-            if response.status_code == 429:
-                retry_after = response.headers.get('Retry-After')
-                if retry_after:
-                    try:
-                        wait_time = int(retry_after)
-                        print(f"Rate limited. Waiting {wait_time}s as requested by server...")
-                        time.sleep(wait_time)
-                    except ValueError:
-                        print("Rate limited. Waiting 60s...")
-                        time.sleep(60)
+            return response
+        except Exception as e:
+            error_type = type(e).__name__
+            if "Timeout" in error_type:
+                print(f"TIMEOUT error for {url}: Request timed out after 30s")
+            elif "Connection" in error_type:
+                print(f"CONNECTION error for {url}: {e}")
+            else:
+                print(f"REQUEST error for {url}: {error_type}: {e}")
+            return None
+
+    # A plain loop instead of a retry decorator keeps the per-call overhead of this hot path low
+    response = None
+    for attempt in range(max_retries + 1):
+        response = _fetch()
+        if response is not None and not _is_retryable_status(response.status_code):
+            break
+        if attempt < max_retries:
+            # Honour Retry-After on 429 rate limiting
+            retry_after = None
+            if response is not None and response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+            time.sleep(_retry_wait(attempt, delay, retry_after))
+
+    if _PAGE_CACHE is not None:
+        if _is_good_response(response):
+            _cache_page(url, response.content, response.headers)
+        elif response is None or response.status_code == 304 or _is_retryable_status(response.status_code):
+            # Unchanged (304), or the server is failing: fall back to the expired copy
+            stale_content = _PAGE_CACHE.get(url, allow_stale=True)
+            if stale_content is not None:
+                if response is not None and response.status_code == 304:
+                    _PAGE_CACHE.touch(url)
+                else:
+                    print(f"WARNING: Serving expired cached copy of {url}")
+                return CachedResponse(url, stale_content)
+    return response
+
+
+def dumps_record(record: dict) -> bytes:
+    """
+    Serialize a record as one JSON line.
+
+    Args:
+        record (dict): The regulation record
+
+    Returns:
+        bytes: UTF-8 encoded JSON followed by a newline
+    """
+    if USE_ORJSON:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def loads_record(line: bytes) -> dict:
+    """
+    Parse one JSON line written by dumps_record.
+
+    Args:
+        line (bytes): The UTF-8 encoded JSON line
+
+    Returns:
+        dict: The regulation record
+
+    Raises:
+        ValueError: If the line is not valid JSON (e.g. truncated)
+    """
+    if USE_ORJSON:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def extract_links_from_content(content: PageElement) -> list:
+    """
+    Extract all links from the given BeautifulSoup PageElement.
+
+    Args:
+        content (PageElement): The HTML content (usually the result of soup.find()).
+
+    Returns:
+        List[Dict]: A list of dictionaries with link text and href.
+    """
+    links = []
+
+    # Find all <a> tags in the content
+    for a_tag in content.find_all("a", href=True):
+        link_text = a_tag.get_text(strip=True)
+        link_href = a_tag["href"]
+
+        # Store the link text and URL in a dictionary
+        links.append({"text": link_text, "href": link_href})
+
+    return links
+
+
+@lru_cache(maxsize=None)
+def _listing_strainer(internal_class: str) -> SoupStrainer:
+    """Build (once per class) a SoupStrainer that keeps only the navigation element."""
+    return SoupStrainer(class_=internal_class)
+
+
+def extract_listing_links(html: bytes, internal_class: str) -> Optional[list]:
+    """
+    Extract the navigation links from a listing (branch) page.
+
+    Uses selectolax when it is installed and BeautifulSoup otherwise. The
+    BeautifulSoup fallback only builds the navigation subtree.
+
+    Args:
+        html (bytes): The raw page content
+        internal_class (str): CSS class of the element holding the navigation links
+
+    Returns:
+        List[Dict] | None: Links as {text, href} dictionaries, or None if the page has
+            no navigation element, i.e. it is a leaf page (an empty one is a branch
+            with no links)
+    """
+    if USE_SELECTOLAX:
+        nav_node = LexborHTMLParser(html).css_first(f".{internal_class}")
+        if nav_node is None:
+            return None
+        return [
+            {
+                "text": a_node.text(deep=True, separator="", strip=True),
+                "href": a_node.attributes.get("href") or "",
+            }
+            for a_node in nav_node.css("a[href]")
+        ]
+
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=_listing_strainer(internal_class))
+    internal_links_element = soup.find(class_=internal_class)
+    if not internal_links_element:
+        return None
+    return extract_links_from_content(internal_links_element)
+
+
+def _is_breadcrumb_prefix(segment: str) -> bool:
+    """Whether a breadcrumb segment comes before the state code (e.g. "Justia", "U.S. Regulations")."""
+    # The state code is the first segment containing "Rules" or "Code" that isn't "U.S. Regulations"
+    return not ("Rules" in segment or "Code" in segment) or segment == "U.S. Regulations"
+
+
+def _strip_breadcrumb_prefix(segments: list[str], state_abb: str) -> list[str]:
+    """Drop the segments before the state code, reusing the prefix found on the state's earlier pages."""
+    prefix = _STATE_BREADCRUMB_PREFIX.get(state_abb)
+    if prefix is not None:
+        skip = len(prefix)
+        if tuple(segments[:skip]) == prefix and skip < len(segments) and not _is_breadcrumb_prefix(segments[skip]):
+            return segments[skip:]
+    # First page of the state, or a page whose prefix differs: scan for the state code
+    filtered = list(dropwhile(_is_breadcrumb_prefix, segments))
+    _STATE_BREADCRUMB_PREFIX[state_abb] = tuple(segments[: len(segments) - len(filtered)])
+    return filtered
+
+
+def _strip_chrome(tag: Tag) -> None:
+    """Remove page chrome (navigation, headers, footers, scripts and styles) from inside a tag."""
+    for elem in tag.find_all(_CHROME_TAGS):
+        elem.decompose()
+
+
+def _text_preview(tag: Tag, length: int = 100) -> str:
+    """The first length characters of tag.get_text(strip=True), without rendering the rest of the subtree."""
+    preview = ""
+    for string in tag.stripped_strings:
+        preview += string
+        if len(preview) >= length:
+            break
+    return preview[:length]
+
+
+def _find_leaf_elements(soup: BeautifulSoup) -> tuple[Optional[Tag], ...]:
+    """
+    Find the elements a leaf page is parsed from in one walk over the tree.
+
+    Equivalent to the first match of each of soup.find("span", class_="breadcrumb-sep"),
+    soup.find("nav", class_="breadcrumbs"), soup.find("h1"),
+    soup.find("div", class_="has-margin-bottom-20"), soup.find(href="/citations.html")
+    and soup.find(id="main-content"), but each of those walks the page from the root
+    and tests every element with bs4's generic matcher.
+
+    Returns:
+        tuple: (breadcrumb separator, breadcrumbs, h1, citation wrapper, citation link,
+            main content), each None if the page has no such element
+    """
+    sep = crumbs = h1 = wrapper = cite = main = None
+    for elem in soup.descendants:
+        if not isinstance(elem, Tag):
+            continue
+        attrs = elem.attrs
+        if cite is None and attrs.get("href") == "/citations.html":
+            cite = elem
+        if main is None and attrs.get("id") == "main-content":
+            main = elem
+        name = elem.name
+        if name == "span":
+            if sep is None and "breadcrumb-sep" in attrs.get("class", ()):
+                sep = elem
+        elif name == "nav":
+            if crumbs is None and "breadcrumbs" in attrs.get("class", ()):
+                crumbs = elem
+        elif name == "h1":
+            if h1 is None:
+                h1 = elem
+        elif name == "div":
+            if wrapper is None and "has-margin-bottom-20" in attrs.get("class", ()):
+                wrapper = elem
+        # Stop once everything is found (main-content comes last on Justia's pages)
+        if main is not None and None not in (sep, crumbs, h1, wrapper, cite):
+            break
+    return sep, crumbs, h1, wrapper, cite, main
+
+
+def parse_regulation_page(html: bytes, url: str, state_abb: str, lex_path: Optional[list[int]] = None) -> dict:
+    """
+    Parse a regulation (leaf) page into a record.
+
+    Args:
+        html (bytes): The raw page content
+        url (str): The URL of the page
+        state_abb (str): State abbreviation
+        lex_path (list[int]): The lexicographical path to the leaf node
+
+    Returns:
+        dict: A dictionary containing the regulation data
+    """
+    soup: BeautifulSoup = BeautifulSoup(html, HTML_PARSER)
+    sep_tag, crumbs_tag, h1_tag, wrapper, cite_tag, main_content = _find_leaf_elements(soup)
+
+    # Extract breadcrumb path. The separator check only runs in debug (non -O) builds.
+    if __debug__:
+        sep = sep_tag.get_text(strip=True)
+        assert sep == _SEP, "Separator is not the right character."
+    path_str = crumbs_tag.get_text(strip=True)
+
+    # Filter out the "Justia › U.S. Law › U.S. Regulations" prefix
+    # Keep only from the state regulations code onwards (e.g., "Administrative Rules of Montana", "Code of Vermont Rules", etc.)
+    filtered_path = _strip_breadcrumb_prefix([segment.strip() for segment in path_str.split(_SEP)], state_abb)
+
+    # Create path string with › separator like the example
+    clean_path = _SEP.join(filtered_path)
+
+    # Extract title - use › separator consistently
+    title_str = h1_tag.get_text(" › ", strip=True)
+
+    # Extract citation if available
+    has_univ_cite = False
+    citation = None
+    if wrapper:
+        has_univ_cite = (
+            wrapper.find("b").get_text(strip=True) == "Universal Citation:"
+        )
+    if cite_tag:
+        citation = cite_tag.get_text(strip=True)
+
+    # Extract content - Justia's HTML structure is broken with content scattered across multiple divs
+    # Strategy: Find main-content div, then collect all sibling content-indent divs until we hit disclaimer
+
+    # Only main-content and the sibling divs after it end up in the record, so page chrome is
+    # stripped from those subtrees as they are reached instead of from the entire page
+    if main_content:
+        _strip_chrome(main_content)
+
+        # Remove disclaimer, newsletter signup, and other junk INSIDE main-content first
+        # These are promotional/footer elements that Justia embeds in the content
+        # (class_="disclaimer" matches every div through bs4's generic attribute matcher;
+        # testing the parsed class list directly is several times faster)
+        for elem in main_content.find_all("div"):
+            if not elem.decomposed and "disclaimer" in elem.get("class", ()):
+                elem.decompose()
+
+        # Remove any div containing footer/promotional keywords (_JUNK_RE) and notification
+        # banners in one walk. Divs inside an already removed div are skipped rather than re-scanned.
+        for elem in main_content.find_all("div"):
+            if elem.decomposed:
+                continue
+            # Remove notification banners
+            elem_id = elem.get("id")
+            if elem_id and "notification" in elem_id.lower():
+                elem.decompose()
+                continue
+            text = elem.get_text(strip=True)
+            # Remove if it contains junk keywords and is relatively short (footer elements)
+            # Long divs might legitimately mention these terms in regulation text
+            if len(text) < 2000 and _JUNK_RE.search(text):
+                elem.decompose()
+
+        # Collect main-content and all sibling divs containing regulation content
+        # Stop when we hit disclaimer or non-content divs
+        collected_divs = [main_content]
+
+        # One lazy pass over the siblings; text nodes between tags are skipped
+        for next_sibling in main_content.next_siblings:
+            if not isinstance(next_sibling, Tag):
+                continue
+
+            if next_sibling.name == "div":
+                _strip_chrome(next_sibling)
+                classes = next_sibling.get("class", [])
+                text_preview = _text_preview(next_sibling)
+
+                # Stop at disclaimer or footer
+                if "disclaimer" in classes or "Disclaimer" in text_preview:
+                    break
+                if "notification" in str(classes).lower() or "footer" in str(classes).lower():
+                    break
+
+                # Collect content-indent divs (these contain continuation of regulation text)
+                if "content-indent" in classes:
+                    collected_divs.append(next_sibling)
+                # Also collect divs that look like regulation content
+                elif any(keyword in text_preview for keyword in ["Section", "subsection", "State Treasurer", "taxpayer"]):
+                    collected_divs.append(next_sibling)
+                else:
+                    break
+
+        # Combine all collected divs
+        combined_html = BeautifulSoup("<div></div>", HTML_PARSER)
+        container = combined_html.div
+        for div in collected_divs:
+            container.append(div)
+
+        # Clean up unwanted elements
+        for elem in container.find_all("h1"):
+            elem.decompose()
+        for elem in container.find_all("div", class_="has-margin-bottom-20"):
+            elem.decompose()
+        for elem in container.find_all(class_="breadcrumbs"):
+            elem.decompose()
+
+        content = container.get_text(separator="\n", strip=False)
+
+        # Clean up whitespace: collapse runs of blank lines to one, then strip every line
+        content = _LINE_WS_RE.sub("\n", _BLANK_LINES_RE.sub("\n\n", content)).strip()
+    else:
+        content = ""
+
+    # Create record matching the required format
+    record = {
+        "url": url,
+        "state": state_abb,
+        "path": clean_path,
+        "title": title_str,
+        "univ_cite": has_univ_cite,
+        "citation": citation,
+        "content": content,
+        "lex_path": lex_path,
+    }
+
+    return record
+
+
+def process_regulation_leaf(
+    state_name: str,
+    state_abb: str,
+    url: str,
+    jsonl_fp: Optional[BinaryIO],
+    lex_path: Optional[list[int]] = None,
+    lock: Optional[threading.Lock] = None,
+    pbar: Optional[tqdm] = None,
+    max_retries: int = 3,
+    scraper=None,
+    response=None,
+) -> dict:
+    """
+    Process the content of a leaf node (individual regulation).
+
+    Args:
+        state_name (str): Full state name
+        state_abb (str): State abbreviation
+        url (str): The URL of the leaf node
+        jsonl_fp (BinaryIO): The binary file pointer to write the JSONL records to (not
+            shared with other threads)
+        lex_path (list[int]): The lexicographical path to the leaf node
+        lock (threading.Lock): A lock to make progress-bar updates and failed-URL log
+            writes thread-safe
+        pbar (tqdm): A tqdm progress bar to update
+        max_retries (int): Maximum number of retry attempts for failed requests
+        scraper: Shared cloudscraper instance
+        response: Response already fetched for url (skips the request when given)
+
+    Returns:
+        dict: A dictionary containing the regulation data
+    """
+    if response is None:
+        response = fetch_with_retry(url, max_retries=max_retries, scraper=scraper)
+    if response and response.status_code == 200:
+        record = parse_regulation_page(response.content, url, state_abb, lex_path)
+
+        if jsonl_fp:
+            # Each thread writes to its own department's part file, so no lock is needed
+            jsonl_fp.write(dumps_record(record))
+        if pbar is not None:
+            try:
+                # tqdm.update() increments its count without a lock (only the
+                # repaint is locked), so concurrent workers would lose ticks
+                with lock:
+                    pbar.update(1)
+            except Exception as pbar_error:
+                # Handle tqdm errors gracefully (e.g., version compatibility issues)
+                pass
+    else:
+        status_code = response.status_code if response else "No response"
+        print(f"Failed to retrieve content for {url}, Status Code: {status_code}")
+        with lock:
+            failed_file = f"failed_{state_abb}.txt"
+            with open(failed_file, "a") as f:
+                f.write(f"{url}\n")
+
+
+def get_output_path(state_abb: str, compress: bool = False) -> str:
+    """
+    Get the path of the output file for a state.
+
+    Args:
+        state_abb (str): The state abbreviation.
+        compress (bool): Whether the output is gzip-compressed.
+
+    Returns:
+        str: regs/{STATE}.jsonl, with a .gz suffix when compressed.
+    """
+    return f"{SAVE_DIR}/{state_abb}.jsonl" + (".gz" if compress else "")
+
+
+def open_output(path: str, mode: str = "rb") -> BinaryIO:
+    """
+    Open an output file in binary mode, transparently (de)compressing .gz files.
+
+    Args:
+        path (str): The output file path.
+        mode (str): "rb", "wb" or "ab".
+
+    Returns:
+        BinaryIO: The opened file.
+    """
+    if path.endswith(".gz"):
+        # Appending starts a new gzip member, which readers treat as one stream
+        return gzip.open(path, mode, compresslevel=OUTPUT_COMPRESSLEVEL)
+    return open(path, mode)
+
+
+def repair_compressed_output(path: str) -> Optional[bytes]:
+    """
+    Drop the unreadable tail of a gzip output file left by an interrupted run.
+
+    A killed run leaves its last gzip member unterminated; appending a new member
+    after it would make everything written on resume unreadable. The file is checked
+    in one streaming pass that only remembers the last complete record. Only if that
+    pass hits a damaged tail are the complete records copied into a fresh file, which
+    replaces the damaged one.
+
+    Args:
+        path (str): The .jsonl.gz output file.
+
+    Returns:
+        bytes | None: The last complete record line, or None if there is none.
+    """
+    if not os.path.exists(path):
+        return None
+
+    num_complete = 0
+    last_line = None
+    try:
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    num_complete += 1
+                    last_line = line
+        return last_line  # file is intact
+    except (EOFError, OSError, gzip.BadGzipFile):
+        pass
+
+    print(f"Repairing {path}: keeping {num_complete} complete records")
+    tmp_path = f"{path}.tmp"
+    # Stream the complete records across; stopping after the last one never reads the damaged tail
+    with gzip.open(path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=OUTPUT_COMPRESSLEVEL) as dst:
+        dst.writelines(islice(src, num_complete))
+    os.replace(tmp_path, path)
+    return last_line
+
+
+def drop_partial_record(path: str) -> None:
+    """
+    Truncate a partial last record left in an uncompressed output file by a killed run.
+
+    Args:
+        path (str): The .jsonl output file.
+    """
+    if not os.path.exists(path) or os.stat(path).st_size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[-1:] == b"\n":
+            return
+        # rfind returns -1 when not even the first record is complete
+        complete_size = mm.rfind(b"\n") + 1
+    print(f"Dropping a partial record at the end of {path}")
+    os.truncate(path, complete_size)
+
+
+def get_part_path(state_abb: str, lex_path: list[int]) -> str:
+    """
+    Get the path of a part file records are written to while a department is scraped.
+
+    A department's parts live in their own directory, and each part is named after
+    the lex_path its records start from, so sorting the names orders the parts.
+
+    Args:
+        state_abb (str): The state abbreviation.
+        lex_path (list[int]): lex_path the part starts from (its first element is the department).
+
+    Returns:
+        str: regs/{STATE}.parts/{dept_idx}/{lex_path joined by dots}.jsonl
+    """
+    return f"{SAVE_DIR}/{state_abb}.parts/{lex_path[0]}/{'.'.join(map(str, lex_path))}.jsonl"
+
+
+def _part_sort_key(part_path: str) -> tuple:
+    # "0.3.1.jsonl" -> ((0, 3, 1), 0); "0.3.1-2.jsonl" (see PartWriter) -> ((0, 3, 1), 2)
+    name = os.path.basename(part_path)[: -len(".jsonl")]
+    start, _, n = name.partition("-")
+    return tuple(int(i) for i in start.split(".")), int(n or 0)
+
+
+def list_part_files(state_abb: str, dept_idx: int) -> list[str]:
+    """
+    List a department's part files in lex_path order.
+
+    Args:
+        state_abb (str): The state abbreviation.
+        dept_idx (int): Index of the department (the first element of its lex_paths).
+
+    Returns:
+        list[str]: The part files (empty if the department has none).
+    """
+    dept_dir = os.path.dirname(get_part_path(state_abb, [dept_idx]))
+    if not os.path.isdir(dept_dir):
+        return []
+    part_paths = [os.path.join(dept_dir, name) for name in os.listdir(dept_dir) if name.endswith(".jsonl")]
+    return sorted(part_paths, key=_part_sort_key)
+
+
+class PartWriter:
+    """
+    Writes one task's records to part files, in the order the task visits them.
+
+    When the task hands a child branch to another worker, split() closes the current
+    part and the records after that child go to a new part named after the child's
+    next sibling. Each part then holds an unbroken lex_path range, and the parts of a
+    department concatenate in name order. A part is only created once a record is
+    written to it, and an existing part (left by an interrupted run) is never appended
+    to, so each part is written by a single task.
+    """
+
+    def __init__(self, state_abb: str, lex_path: list[int]):
+        self.state_abb = state_abb
+        self._start = lex_path
+        self._fp = None
+
+    def _open(self) -> BinaryIO:
+        part_path = get_part_path(self.state_abb, self._start)
+        stem, n = part_path[: -len(".jsonl")], 0
+        while True:
+            try:
+                return open(part_path, "xb", buffering=PART_BUFFER_SIZE)
+            except FileExistsError:
+                n += 1
+                part_path = f"{stem}-{n}.jsonl"
+
+    def write(self, data: bytes) -> None:
+        if self._fp is None:
+            self._fp = self._open()
+        self._fp.write(data)
+
+    def split(self, lex_path: list[int]) -> None:
+        """Close the current part; records written after this start a new part at lex_path."""
+        self.close()
+        self._start = lex_path
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _part_lex_bounds(part_path: str) -> Optional[tuple[list[int], list[int]]]:
+    # The lex_paths of a part's first and last records, or None for an empty part
+    with open(part_path, "rb") as f:
+        first_line = f.readline()
+        if not first_line:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            last_line = mm[mm.rfind(b"\n", 0, end - 1) + 1 : end]
+    return loads_record(first_line)["lex_path"], loads_record(last_line)["lex_path"]
+
+
+def merge_department_parts(
+    state_abb: str, dept_idx: int, out_fp: BinaryIO, after: Optional[list[int]] = None
+) -> None:
+    """
+    Append a finished department's part files to the output and delete them.
+
+    The parts normally cover disjoint lex_path ranges and are copied one after
+    another. Parts left by an interrupted run can overlap the ones written after
+    resuming; those are merged record by record on lex_path instead.
+
+    Args:
+        state_abb (str): The state abbreviation.
+        dept_idx (int): Index of the department.
+        out_fp (BinaryIO): The output file opened with open_output.
+        after (list[int] | None): Only append records after this lex_path (the last
+            one an interrupted merge of this department got into the output).
+    """
+    part_paths = list_part_files(state_abb, dept_idx)
+    bounds = [_part_lex_bounds(part_path) for part_path in part_paths] if len(part_paths) > 1 else []
+    bounds = [b for b in bounds if b is not None]
+    disjoint = all(prev[1] < nxt[0] for prev, nxt in zip(bounds, bounds[1:]))
+    if disjoint and after is None:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part_fp:
+                shutil.copyfileobj(part_fp, out_fp, PART_BUFFER_SIZE)
+    else:
+        part_fps = [open(part_path, "rb") for part_path in part_paths]
+        try:
+            if disjoint:
+                lines = chain.from_iterable(part_fps)
+            else:
+                lines = heapq.merge(*part_fps, key=lambda line: loads_record(line)["lex_path"])
+            if after is not None:
+                lines = dropwhile(lambda line: loads_record(line)["lex_path"] <= after, lines)
+            out_fp.writelines(lines)
+        finally:
+            for part_fp in part_fps:
+                part_fp.close()
+    shutil.rmtree(os.path.dirname(get_part_path(state_abb, [dept_idx])), ignore_errors=True)
+
+
+def recover_part_file(part_path: str) -> set[str]:
+    """
+    Prepare a part file of a department that was still running when the last run stopped.
+
+    A part cut off mid-write ends in a partial record, which is truncated away.
+
+    Args:
+        part_path (str): The part file.
+
+    Returns:
+        set[str]: URLs of the records already in the part
+    """
+    urls = set()
+    complete_size = 0
+    with open(part_path, "rb") as part_fp:
+        for line in part_fp:
+            if not line.endswith(b"\n"):
+                break
+            urls.add(loads_record(line)["url"])
+            complete_size += len(line)
+    os.truncate(part_path, complete_size)
+    return urls
+
+
+class DepartmentMerger:
+    """
+    Appends finished departments' part files to the output in department order.
+
+    Departments finish in any order, but a department is only merged once every
+    department before it has been, so the output holds whole departments in lex_path
+    order and only unfinished departments are left in part files if the run is interrupted.
+    """
 
-            return response
-        except Exception as e:
-            error_type = type(e).__name__
-            if "Timeout" in error_type:
-                print(f"TIMEOUT error for {url}: Request timed out after 30s")
-            elif "Connection" in error_type:
-                print(f"CONNECTION error for {url}: {e}")
-            else:
-                print(f"REQUEST error for {url}: {error_type}: {e}")
-            return None
+    def __init__(self, state_abb: str, out_fp: BinaryIO, dept_order: list[int]):
+        self.state_abb = state_abb
+        self.out_fp = out_fp
+        self.dept_order = dept_order
+        self._finished = set()
+        self._next = 0
 
-    try:
-        return _fetch()
-    except Exception as e:
-        print(f"UNEXPECTED error for {url}: {e}")
-        return None
+    def finish(self, dept_idx: int) -> None:
+        """Mark a department done and merge every department that is now next in order."""
+        self._finished.add(dept_idx)
+        while self._next < len(self.dept_order) and self.dept_order[self._next] in self._finished:
+            merge_department_parts(self.state_abb, self.dept_order[self._next], self.out_fp)
+            self._next += 1
+        # Push merged departments to disk so an interrupted run keeps them for --resume
+        self.out_fp.flush()
 
 
-def extract_links_from_content(content: PageElement) -> list:
+def get_last_lex_path(state_abb: str, compress: bool = False) -> Optional[list[int]]:
     """
-    Extract all links from the given BeautifulSoup PageElement.
+    Get the lexicographical path of the last successfully scraped entry.
 
     Args:
-        content (PageElement): The HTML content (usually the result of soup.find()).
+        state_abb (str): The state abbreviation to check.
+        compress (bool): Whether the output is gzip-compressed.
 
     Returns:
-        List[Dict]: A list of dictionaries with link text and href.
+        list[int] | None: The last lex_path, or None if the file doesn't exist/is empty.
     """
-    links = []
+    save_path = get_output_path(state_abb, compress)
+    if not os.path.exists(save_path) or os.stat(save_path).st_size == 0:
+        return None
 
-    # Find all <a> tags in the content
-    for a_tag in content.find_all("a", href=True):
-        link_text = a_tag.get_text(strip=True)
-        link_href = a_tag["href"]
+    if compress:
+        # gzip streams can't be read backwards; decompress through to the last line
+        last_line = b""
+        with open_output(save_path) as f:
+            for last_line in f:
+                pass
+        if not last_line:
+            return None
+        return loads_record(last_line).get("lex_path")
 
-        # Store the link text and URL in a dictionary
-        links.append({"text": link_text, "href": link_href})
+    # Map the file and search backwards for the newline before the last record in one
+    # call, rather than seeking back a byte at a time
+    with open(save_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm)
+        # Skip the record's own trailing newline; rfind returns -1 for a one line file
+        start = mm.rfind(b"\n", 0, end - 1) + 1
+        last_line = mm[start:end]
 
-    return links
+    return loads_record(last_line).get("lex_path")
 
 
-def process_regulation_leaf(
-    state_name: str,
-    state_abb: str,
-    url: str,
-    jsonl_fp: Optional[TextIOWrapper],
-    lex_path: Optional[list[int]] = None,
-    lock: Optional[threading.Lock] = None,
-    pbar: Optional[tqdm] = None,
-    max_retries: int = 3,
-    scraper=None,
-) -> dict:
+def load_scraped_urls(state_abb: str, compress: bool = False) -> set[str]:
     """
-    Process the content of a leaf node (individual regulation).
+    Get the URLs of every page already written to the state's output file.
 
     Args:
-        state_name (str): Full state name
-        state_abb (str): State abbreviation
-        url (str): The URL of the leaf node
-        jsonl_fp (TextIOWrapper): The file pointer to write the JSONL records to
-        lex_path (list[int]): The lexicographical path to the leaf node
-        lock (threading.Lock): A lock to make file writes thread-safe
-        pbar (tqdm): A tqdm progress bar to update
-        max_retries (int): Maximum number of retry attempts for failed requests
-        scraper: Shared cloudscraper instance
+        state_abb (str): The state abbreviation to check.
+        compress (bool): Whether the output is gzip-compressed.
 
     Returns:
-        dict: A dictionary containing the regulation data
+        set[str]: URLs of the saved records (empty if the file doesn't exist).
     """
-    response = fetch_with_retry(url, max_retries=max_retries, scraper=scraper)
-    if response and response.status_code == 200:
-        soup: BeautifulSoup = BeautifulSoup(response.content, "html.parser")
-
-        # Extract breadcrumb path
-        sep = soup.find("span", class_="breadcrumb-sep").get_text(strip=True)
-        assert ord(sep) == 8250, "Separator is not the right character."
-        path_str = soup.find("nav", class_="breadcrumbs").get_text(strip=True)
-        path_arr = path_str.split(sep)
-
-        # Filter out the "Justia › U.S. Law › U.S. Regulations" prefix
-        # Keep only from the state regulations code onwards (e.g., "Administrative Rules of Montana", "Code of Vermont Rules", etc.)
-        filtered_path = []
-        start_collecting = False
-        for segment in path_arr:
-            segment = segment.strip()
-            # Start collecting when we find a segment that contains "Rules" or "Code" and isn't just "U.S. Regulations"
-            if not start_collecting and ("Rules" in segment or "Code" in segment) and segment != "U.S. Regulations":
-                start_collecting = True
-            if start_collecting:
-                filtered_path.append(segment)
-
-        # Create path string with › separator like the example
-        clean_path = "›".join(filtered_path)
-
-        # Extract title - use › separator consistently
-        title_str = soup.find("h1").get_text(" › ", strip=True)
-
-        # Extract citation if available
-        has_univ_cite = False
-        citation = None
-        if wrapper := soup.find("div", class_="has-margin-bottom-20"):
-            has_univ_cite = (
-                wrapper.find("b").get_text(strip=True) == "Universal Citation:"
-            )
-        if cite_tag := soup.find(href="/citations.html"):
-            citation = cite_tag.get_text(strip=True)
+    save_path = get_output_path(state_abb, compress)
+    urls = set()
+    if not os.path.exists(save_path):
+        return urls
 
-        # Extract content - Justia's HTML structure is broken with content scattered across multiple divs
-        # Strategy: Find main-content div, then collect all sibling content-indent divs until we hit disclaimer
+    with open_output(save_path) as f:
+        for line in f:
+            try:
+                urls.add(loads_record(line)["url"])
+            except (ValueError, KeyError):
+                # A run killed mid-write can leave a truncated last line
+                continue
+    return urls
 
-        # First remove unwanted elements from the entire page
-        for elem in soup.find_all(["header", "footer", "nav", "script", "style", "noscript"]):
-            elem.decompose()
 
-        main_content = soup.find(id="main-content")
-        if main_content:
-            # Remove disclaimer, newsletter signup, and other junk INSIDE main-content first
-            # These are promotional/footer elements that Justia embeds in the content
-            for elem in main_content.find_all("div", class_="disclaimer"):
-                elem.decompose()
+def iter_branch_children(
+    links: list,
+    url: str,
+    path: list[int],
+    continue_from: Optional[list[int]],
+    site_url: str,
+):
+    """
+    Yield the child pages of a branch node that should be scraped.
 
-            # Remove any div containing footer/promotional keywords
-            junk_keywords = [
-                "Disclaimer", "reCAPTCHA", "Free Daily Summaries", "Newsletter",
-                "Sign Up", "Enter Your Email", "Ask a Lawyer", "Find a Lawyer",
-                "Get Listed", "Justia Legal Resources", "Justia Connect",
-                "Privacy Policy", "Terms of Service", "Google", "CLE Credits",
-                "Webinars", "Toggle button", "Lawyers - Get Listed",
-                "Get free summaries", "Free Answers", "Our Suggestions"
-            ]
-
-            for elem in main_content.find_all("div"):
-                text = elem.get_text(strip=True)
-                # Remove if it contains junk keywords and is relatively short (footer elements)
-                # Long divs might legitimately mention these terms in regulation text
-                if len(text) < 2000 and any(keyword in text for keyword in junk_keywords):
-                    elem.decompose()
+    Skips RESERVED/REPEALED and malformed links, stops at the depth limit and
+    applies the resume position.
 
-            # Remove notification banners
-            for elem in main_content.find_all("div", id=lambda x: x and "notification" in x.lower() if x else False):
-                elem.decompose()
+    Args:
+        links (list): The branch page's links as {text, href} dictionaries
+        url (str): The URL of the branch page
+        path (list[int]): The lexicographical path to the branch page
+        continue_from (list[int] | None): The lex_path to resume after, if any
+        site_url (str): Base URL the relative links are resolved against
+
+    Yields:
+        tuple: (child_url, child_path, child_continue_from)
+    """
+    start_idx = 0
+    # If resuming and current path is a prefix of the target resume path
+    if continue_from and path == continue_from[: len(path)]:
+        # Set the starting index for links at this level
+        if len(path) < len(continue_from):
+            start_idx = continue_from[len(path)]
+
+    for i, link in enumerate(links):
+        if i < start_idx:
+            continue
+
+        # Skip RESERVED and REPEALED sections
+        if is_reserved_or_repealed(link["text"]):
+            continue
+
+        href = link["href"]
+
+        # Skip malformed URLs (double slashes, empty paths, circular references)
+        if is_malformed_href(href):
+            print(f"WARNING: Skipping malformed URL: {site_url}{href}")
+            continue
+
+        # Prevent infinite recursion by checking if we've exceeded reasonable path depth
+        # Most regulations are 5-6 levels deep; 20 is a safe upper limit
+        if len(path) >= 20:
+            print(f"WARNING: Excessive path depth ({len(path)}) at {url}, stopping recursion")
+            break
 
-            # Collect main-content and all sibling divs containing regulation content
-            # Stop when we hit disclaimer or non-content divs
-            collected_divs = [main_content]
+        new_path = path + [i]
 
-            current = main_content
-            while True:
-                next_sibling = current.find_next_sibling()
-                if not next_sibling:
-                    break
+        # If we move past the resume index, disable resume logic for subsequent branches
+        new_continue_from = continue_from
+        if continue_from and i > start_idx:
+            new_continue_from = None
 
-                if next_sibling.name == "div":
-                    classes = next_sibling.get("class", [])
-                    text_preview = next_sibling.get_text(strip=True)[:100]
-
-                    # Stop at disclaimer or footer
-                    if "disclaimer" in classes or "Disclaimer" in text_preview:
-                        break
-                    if "notification" in str(classes).lower() or "footer" in str(classes).lower():
-                        break
-
-                    # Collect content-indent divs (these contain continuation of regulation text)
-                    if "content-indent" in classes:
-                        collected_divs.append(next_sibling)
-                        current = next_sibling
-                    # Also collect divs that look like regulation content
-                    elif any(keyword in text_preview for keyword in ["Section", "subsection", "State Treasurer", "taxpayer"]):
-                        collected_divs.append(next_sibling)
-                        current = next_sibling
-                    else:
-                        break
-                else:
-                    current = next_sibling
+        yield f"{site_url}{href}", new_path, new_continue_from
 
-            # Combine all collected divs
-            combined_html = BeautifulSoup("<div></div>", "html.parser")
-            container = combined_html.div
-            for div in collected_divs:
-                container.append(div)
 
-            # Clean up unwanted elements
-            for elem in container.find_all("h1"):
-                elem.decompose()
-            for elem in container.find_all("div", class_="has-margin-bottom-20"):
-                elem.decompose()
-            for elem in container.find_all(class_="breadcrumbs"):
-                elem.decompose()
+def mark_visited(visited_urls: dict, url: str) -> bool:
+    """
+    Record a URL as visited, without a lock.
+
+    dict.setdefault is a single atomic operation, so when several threads reach the
+    same URL at once exactly one of them inserts its marker and gets True. A plain
+    set cannot do this: its "in" test and add() are two steps another thread can
+    run between.
 
-            content = container.get_text(separator="\n", strip=False)
+    Args:
+        visited_urls (dict): URLs already visited (values are unused)
+        url (str): The URL about to be scraped
 
-            # Clean up whitespace
-            lines = content.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                stripped = line.strip()
-                if stripped:
-                    cleaned_lines.append(stripped)
-                elif cleaned_lines and cleaned_lines[-1] != '':
-                    cleaned_lines.append('')
+    Returns:
+        bool: True if url was not visited before and the caller should scrape it
+    """
+    marker = object()
+    return visited_urls.setdefault(url, marker) is marker
 
-            while cleaned_lines and cleaned_lines[-1] == '':
-                cleaned_lines.pop()
 
-            content = '\n'.join(cleaned_lines)
-        else:
-            content = ""
-
-        # Create record matching the required format
-        record = {
-            "url": url,
-            "state": state_abb,
-            "path": clean_path,
-            "title": title_str,
-            "univ_cite": has_univ_cite,
-            "citation": citation,
-            "content": content,
-            "lex_path": lex_path,
-        }
+def log_failed_branch(state_abb: str, lock: threading.Lock, url: str, lex_path: list[int], error: Exception) -> None:
+    """
+    Log a branch that failed with an exception to failed_{STATE}.txt.
 
-        if jsonl_fp:
-            with lock:
-                jsonl_fp.write(json.dumps(record, ensure_ascii=False))
-                jsonl_fp.write("\n")
-        if pbar is not None:
-            try:
-                with lock:
-                    pbar.update(1)
-            except Exception as pbar_error:
-                # Handle tqdm errors gracefully (e.g., version compatibility issues)
-                pass
-    else:
-        status_code = response.status_code if response else "No response"
-        print(f"Failed to retrieve content for {url}, Status Code: {status_code}")
+    The URL, lex_path and error are saved in JSON format for accurate recovery.
+    """
+    try:
         with lock:
             failed_file = f"failed_{state_abb}.txt"
             with open(failed_file, "a") as f:
-                f.write(f"{url}\n")
+                fail_record = {
+                    "url": url,
+                    "lex_path": lex_path,
+                    "error": str(error)
+                }
+                f.write(json.dumps(fail_record) + "\n")
+    except Exception as log_error:
+        print(f"ERROR: Could not log failed URL: {log_error}")
 
 
-def get_last_lex_path(state_abb: str) -> Optional[list[int]]:
+class BranchScheduler:
     """
-    Get the lexicographical path of the last successfully scraped entry.
+    Shares the branches of the crawl between the thread pool's workers.
 
-    Args:
-        state_abb (str): The state abbreviation to check.
-
-    Returns:
-        list[int] | None: The last lex_path, or None if the file doesn't exist/is empty.
+    While some threads are idle, a worker hands the children of the branch it is on
+    to the pool instead of recursing into them, so a large department is split across
+    every thread instead of being left to the one that picked it up. The pool's own
+    queue is the work queue. The scheduler counts each department's unfinished tasks
+    and puts the department on `finished` when the last of them returns.
     """
-    save_dir = "regs"
-    save_path = f"{save_dir}/{state_abb}.jsonl"
-    if not os.path.exists(save_path) or os.stat(save_path).st_size == 0:
-        return None
-
-    with open(save_path, "rb") as f:
-        try:  # catch OSError in case of a one line file
-            f.seek(-2, os.SEEK_END)
-            while f.read(1) != b"\n":
-                f.seek(-2, os.SEEK_CUR)
-        except OSError:
-            f.seek(0)
-        last_line = f.readline().decode()
 
-    return json.loads(last_line).get("lex_path")
+    def __init__(self, executor: ThreadPoolExecutor, num_threads: int):
+        self.executor = executor
+        self.num_threads = num_threads
+        self.finished = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._active = 0
+
+    def has_idle_worker(self) -> bool:
+        """Whether a thread would be left without work (read without the lock; a hint only)."""
+        return self._active < self.num_threads
+
+    def submit(self, dept_idx: int, fn, *args) -> None:
+        """Queue fn(*args) as a task of department dept_idx."""
+        with self._lock:
+            self._pending[dept_idx] = self._pending.get(dept_idx, 0) + 1
+            self._active += 1
+        self.executor.submit(self._run, dept_idx, fn, args)
+
+    def _run(self, dept_idx: int, fn, args) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"ERROR: Task in department {dept_idx} failed: {e}")
+        finally:
+            # A task submits its children before it returns, so the count
+            # only reaches zero once the whole department is done
+            with self._lock:
+                self._active -= 1
+                self._pending[dept_idx] -= 1
+                done = self._pending[dept_idx] == 0
+            if done:
+                self.finished.put(dept_idx)
 
 
 def scrape_branch(
@@ -482,75 +1574,60 @@ def scrape_branch(
     continue_from: Optional[list[int]],
     state_name: str,
     state_abb: str,
-    jsonl_fp: TextIOWrapper,
+    jsonl_fp: PartWriter,
     site_url: str,
     internal_class: str,
     lock: threading.Lock,
-    visited_urls: set,
+    visited_urls: dict,
     pbar: Optional[tqdm] = None,
     dept_pbar: Optional[tqdm] = None,
     max_retries: int = 3,
     scraper=None,
+    scheduler: Optional[BranchScheduler] = None,
 ):
     """
     Recursively scrapes a branch of the regulations website.
     Skips RESERVED and REPEALED sections.
     Tracks visited URLs to prevent infinite loops.
+    With a scheduler, children are handed to idle threads instead of being recursed into.
     """
     # Check if we've already visited this URL (prevents circular references)
-    with lock:
-        if url in visited_urls:
-            return
-        visited_urls.add(url)
+    if not mark_visited(visited_urls, url):
+        return
 
     response = fetch_with_retry(url, max_retries=max_retries, scraper=scraper)
     if response and response.status_code == 200:
-        soup: BeautifulSoup = BeautifulSoup(response.content, "html.parser")
-        internal_links_element = soup.find(
-            class_=internal_class
-        )  # these will be URLs relative to the base_url
-        if internal_links_element:  # This is a branch node
-            links = extract_links_from_content(internal_links_element)
-
-            start_idx = 0
-            # If resuming and current path is a prefix of the target resume path
-            if continue_from and path == continue_from[: len(path)]:
-                # Set the starting index for links at this level
-                if len(path) < len(continue_from):
-                    start_idx = continue_from[len(path)]
-
-            for i, link in enumerate(links):
-                if i < start_idx:
-                    continue
-
-                # Skip RESERVED and REPEALED sections
-                if is_reserved_or_repealed(link["text"]):
-                    continue
-
-                href = link["href"]
-
-                # Skip malformed URLs (double slashes, empty paths, circular references)
-                # These cause infinite recursion loops
-                if href.endswith("//") or "//" in href.replace("://", ""):
-                    print(f"WARNING: Skipping malformed URL: {site_url}{href}")
+        # these will be URLs relative to the base_url
+        links = extract_listing_links(response.content, internal_class)
+        if links is not None:  # This is a branch node
+            for child_url, new_path, new_continue_from in iter_branch_children(
+                links, url, path, continue_from, site_url
+            ):
+                if scheduler is not None and scheduler.has_idle_worker():
+                    scheduler.submit(
+                        path[0],
+                        scrape_subtree,
+                        child_url,
+                        new_path,
+                        new_continue_from,
+                        state_name,
+                        state_abb,
+                        site_url,
+                        internal_class,
+                        lock,
+                        visited_urls,
+                        pbar,
+                        dept_pbar,
+                        max_retries,
+                        scraper,
+                        scheduler,
+                    )
+                    # The child's records go to its own parts; ours continue after its subtree
+                    jsonl_fp.split(new_path[:-1] + [new_path[-1] + 1])
                     continue
-
-                # Prevent infinite recursion by checking if we've exceeded reasonable path depth
-                # Most regulations are 5-6 levels deep; 20 is a safe upper limit
-                if len(path) >= 20:
-                    print(f"WARNING: Excessive path depth ({len(path)}) at {url}, stopping recursion")
-                    break
-
-                new_path = path + [i]
-
-                # If we move past the resume index, disable resume logic for subsequent branches
-                new_continue_from = continue_from
-                if continue_from and i > start_idx:
-                    new_continue_from = None
-
                 try:
                     scrape_branch(
-                        f"{site_url}{href}",
+                        child_url,
                         new_path,
                         new_continue_from,
                         state_name,
@@ -564,31 +1641,22 @@ def scrape_branch(
                         dept_pbar,
                         max_retries,
                         scraper,
+                        scheduler,
                     )
                 except Exception as e:
-                    print(f"ERROR: Failed to process {site_url}{href}: {e}")
+                    print(f"ERROR: Failed to process {child_url}: {e}")
                     # Log the failed URL, lex_path, and error for recovery
-                    try:
-                        with lock:
-                            failed_file = f"failed_{state_abb}.txt"
-                            with open(failed_file, "a") as f:
-                                # Save URL and lex_path in JSON format for accurate recovery
-                                fail_record = {
-                                    "url": f"{site_url}{href}",
-                                    "lex_path": new_path,
-                                    "error": str(e)
-                                }
-                                f.write(json.dumps(fail_record) + "\n")
-                    except Exception as log_error:
-                        print(f"ERROR: Could not log failed URL: {log_error}")
+                    log_failed_branch(state_abb, lock, child_url, new_path, e)
         else:  # This is a leaf node
             # Skip the exact leaf node we are resuming from
             if continue_from and path == continue_from:
                 return
 
             try:
+                # Reuse the page we just fetched to tell branch from leaf instead of downloading it again
                 process_regulation_leaf(
-                    state_name, state_abb, url, jsonl_fp, lex_path=path, lock=lock, pbar=pbar, max_retries=max_retries, scraper=scraper
+                    state_name, state_abb, url, jsonl_fp, lex_path=path, lock=lock, pbar=pbar, max_retries=max_retries, scraper=scraper,
+                    response=response,
                 )
             except Exception as e:
                 # any other error other than status code, e.g. html element doesn't exist
@@ -613,63 +1681,421 @@ def scrape_branch(
             print(f"ERROR: Could not log failed URL: {log_error}")
 
 
-def worker(
-    work_queue: queue.Queue,
+def scrape_subtree(
+    url: str,
+    path: list[int],
+    continue_from: Optional[list[int]],
     state_name: str,
     state_abb: str,
-    jsonl_fp: TextIOWrapper,
     site_url: str,
     internal_class: str,
     lock: threading.Lock,
-    visited_urls: set,
+    visited_urls: dict,
     pbar: Optional[tqdm] = None,
     dept_pbar: Optional[tqdm] = None,
     max_retries: int = 3,
     scraper=None,
+    scheduler: Optional[BranchScheduler] = None,
 ):
     """
-    Worker thread function to process tasks from the queue.
+    Scrape a branch and its descendants as one task on the thread pool.
+
+    Records are written to part files of the branch's department (see PartWriter),
+    which the caller merges into the output once the department is done.
     """
-    while True:
+    with PartWriter(state_abb, path) as part_fp:
         try:
-            href, path, continue_from, dept_name = work_queue.get_nowait()
-        except queue.Empty:
-            break
+            scrape_branch(
+                url=url,
+                path=path,
+                continue_from=continue_from,
+                state_name=state_name,
+                state_abb=state_abb,
+                jsonl_fp=part_fp,
+                site_url=site_url,
+                internal_class=internal_class,
+                lock=lock,
+                visited_urls=visited_urls,
+                pbar=pbar,
+                dept_pbar=dept_pbar,
+                max_retries=max_retries,
+                scraper=scraper,
+                scheduler=scheduler,
+            )
+        except Exception as e:
+            print(f"ERROR: Failed to process {url}: {e}")
+            log_failed_branch(state_abb, lock, url, path, e)
+
+
+def scrape_department(
+    href: str,
+    path: list[int],
+    continue_from: Optional[list[int]],
+    dept_name: str,
+    state_name: str,
+    state_abb: str,
+    site_url: str,
+    internal_class: str,
+    lock: threading.Lock,
+    visited_urls: dict,
+    pbar: Optional[tqdm] = None,
+    dept_pbar: Optional[tqdm] = None,
+    max_retries: int = 3,
+    scraper=None,
+    scheduler: Optional[BranchScheduler] = None,
+):
+    """
+    Scrape one top-level department. Runs as a task on the thread pool.
+    """
+    # Update department progress bar description
+    if dept_pbar:
+        dept_pbar.set_description(f"Department: {dept_name}")
+
+    scrape_subtree(
+        f"{site_url}{href}",
+        path,
+        continue_from,
+        state_name,
+        state_abb,
+        site_url,
+        internal_class,
+        lock,
+        visited_urls,
+        pbar,
+        dept_pbar,
+        max_retries,
+        scraper,
+        scheduler,
+    )
+
+
+# Transport errors the async crawler retries, for whichever clients are installed
+_ASYNC_REQUEST_ERRORS = (asyncio.TimeoutError,)
+if USE_AIOHTTP:
+    _ASYNC_REQUEST_ERRORS += (aiohttp.ClientError,)
+if USE_HTTPX:
+    _ASYNC_REQUEST_ERRORS += (httpx.HTTPError,)
+
+
+class AsyncCrawler:
+    """
+    Crawls departments concurrently on one asyncio event loop with aiohttp.
+
+    Fetches are bounded by a semaphore and HTML is parsed on the default
+    executor so parsing never blocks the loop. A second semaphore bounds the
+    pages held from fetch until they are parsed, and each branch runs at most
+    `concurrency` children at once. Each department's records are written to
+    its own part file from the loop thread only, in lex_path order, so no file
+    lock is needed.
+    """
+
+    def __init__(
+        self,
+        session,
+        state_abb: str,
+        site_url: str,
+        internal_class: str,
+        visited_urls: dict,
+        pbar: Optional[tqdm] = None,
+        max_retries: int = 3,
+        delay: float = 1.0,
+        concurrency: int = ASYNC_CONCURRENCY,
+    ):
+        self.session = session
+        self.state_abb = state_abb
+        self.site_url = site_url
+        self.internal_class = internal_class
+        self.visited_urls = visited_urls
+        self.pbar = pbar
+        self.max_retries = max_retries
+        self.delay = delay
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.pages_in_flight = asyncio.Semaphore(concurrency * ASYNC_PAGES_PER_REQUEST)
+        # Failed-URL log writes come from the loop thread only, but log_failed_branch takes a lock
+        self.log_lock = threading.Lock()
+
+    def _log_failed(self, entry: str) -> None:
+        try:
+            with open(f"failed_{self.state_abb}.txt", "a") as f:
+                f.write(f"{entry}\n")
+        except Exception as log_error:
+            print(f"ERROR: Could not log failed URL: {log_error}")
+
+    async def _get(self, url: str, headers: Optional[dict]):
+        """
+        Issue one GET with the crawler's client (aiohttp, or httpx over HTTP/2).
+
+        Returns:
+            tuple: (status code, response headers, body bytes for a 200 response or None)
+        """
+        if USE_HTTPX and isinstance(self.session, httpx.AsyncClient):
+            response = await self.session.get(url, headers=headers)
+            return response.status_code, response.headers, response.content if response.status_code == 200 else None
+        async with self.session.get(url, headers=headers) as response:
+            content = await response.read() if response.status == 200 else None
+            return response.status, response.headers, content
+
+    async def fetch(self, url: str):
+        """
+        Fetch a URL, retrying errors, 429s and 5xx responses with exponential backoff.
+
+        Returns:
+            tuple: (status_code or None, content bytes or None)
+        """
+        # Cache reads and writes (file I/O and gzip) run on the executor, off the loop
+        loop = asyncio.get_running_loop()
+        conditional_headers = None
+        if _PAGE_CACHE is not None:
+            cached_content = await loop.run_in_executor(None, _PAGE_CACHE.get, url)
+            if cached_content is not None:
+                return 200, cached_content
+            conditional_headers = await loop.run_in_executor(None, _PAGE_CACHE.validators, url) or None
+
+        status = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self.semaphore:
+                    if _RATE_LIMITER is not None:
+                        await asyncio.sleep(_RATE_LIMITER.reserve())
+                    status, headers, content = await self._get(url, conditional_headers)
+                if _RATE_LIMITER is not None:
+                    _RATE_LIMITER.feedback(status)
+                if status == 200:
+                    if _PAGE_CACHE is not None:
+                        await loop.run_in_executor(None, _cache_page, url, content, headers)
+                    return status, content
+                if status == 304:
+                    break
+                print(f"HTTP {status} error for {url}")
+                if not _is_retryable_status(status):
+                    return status, None
+                if status == 429:
+                    retry_after = headers.get("Retry-After")
+            except _ASYNC_REQUEST_ERRORS as e:
+                print(f"REQUEST error for {url}: {type(e).__name__}: {e}")
+            if attempt < self.max_retries:
+                # Wait outside the semaphore so other requests keep their slots
+                await asyncio.sleep(_retry_wait(attempt, self.delay, retry_after))
+
+        if _PAGE_CACHE is not None:
+            # Unchanged (304), or the server is failing: fall back to the expired copy
+            stale_content = await loop.run_in_executor(None, partial(_PAGE_CACHE.get, url, allow_stale=True))
+            if stale_content is not None:
+                if status == 304:
+                    await loop.run_in_executor(None, _PAGE_CACHE.touch, url)
+                else:
+                    print(f"WARNING: Serving expired cached copy of {url}")
+                return 200, stale_content
+        return status, None
+
+    def _parse_page(self, content: bytes, url: str, path: list[int], continue_from: Optional[list[int]]):
+        """
+        Parse a fetched page on an executor thread.
+
+        Returns:
+            tuple: (links, None) for a branch page, (None, record) for a leaf page, or
+                (None, None) for the leaf being resumed from
+        """
+        links = extract_listing_links(content, self.internal_class)
+        if links is not None:
+            return links, None
+        # Skip the exact leaf node we are resuming from
+        if continue_from and path == continue_from:
+            return None, None
+        return None, parse_regulation_page(content, url, self.state_abb, path)
+
+    async def scrape_branch(self, url: str, path: list[int], continue_from: Optional[list[int]], emit: Callable[[bytes], None]) -> None:
+        """
+        Scrape a branch page and all of its children concurrently.
+
+        Args:
+            emit: Called with each serialized record of the subtree, in lex_path order
+        """
+        if not mark_visited(self.visited_urls, url):
+            return
+
+        # Hold a slot until the page is parsed, so fetched bodies can't pile up waiting
+        # for the executor
+        async with self.pages_in_flight:
+            status, content = await self.fetch(url)
+            if content is None:
+                status_code = status if status is not None else "No response"
+                print(f"Failed to retrieve content for {url}, Status Code: {status_code}")
+                self._log_failed(f"{url} | Status Code: {status_code}")
+                return
+
+            # Classify and parse the page in a single executor hop
+            loop = asyncio.get_running_loop()
+            try:
+                links, record = await loop.run_in_executor(None, self._parse_page, content, url, path, continue_from)
+            except Exception as e:
+                print(f"ERROR: Failed to parse {url}: {e}")
+                self._log_failed(f"{url} | Error: {e}")
+                return
+
+        if links is not None:  # This is a branch node
+            children = list(iter_branch_children(links, url, path, continue_from, self.site_url))
+            await self._scrape_children(children, emit)
+            return
+        if record is None:
+            return
+
+        emit(dumps_record(record))
+        if self.pbar is not None:
+            self.pbar.update(1)
+
+    async def _scrape_children(self, children: list, emit: Callable[[bytes], None]) -> None:
+        """
+        Scrape a branch's children concurrently, emitting their records in child order.
+
+        Children are started in order by at most `concurrency` workers. The earliest
+        unfinished child emits straight through; a later child buffers its records
+        until every child before it is done.
+        """
+        buffers = [[] for _ in children]
+        done = [False] * len(children)
+        head = 0
+
+        def child_emit(i: int):
+            def _emit(record: bytes) -> None:
+                if i == head:
+                    emit(record)
+                else:
+                    buffers[i].append(record)
+            return _emit
+
+        async def run(i: int, child: tuple) -> None:
+            nonlocal head
+            try:
+                await self.scrape_branch(*child, child_emit(i))
+            except Exception as e:
+                # Log the child like a failed branch in the threaded crawler and keep its
+                # siblings going; letting it escape would abandon them mid-department
+                print(f"ERROR: Failed to process {child[0]}: {e}")
+                log_failed_branch(self.state_abb, self.log_lock, child[0], child[1], e)
+            finally:
+                done[i] = True
+                # Hand the output to the next unfinished child, flushing what it and
+                # any finished children after it have buffered
+                while head < len(children) and done[head]:
+                    head += 1
+                    if head < len(children):
+                        buffered, buffers[head] = buffers[head], None
+                        for record in buffered:
+                            emit(record)
+
+        pending = iter(enumerate(children))
+
+        async def worker() -> None:
+            for i, child in pending:
+                await run(i, child)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(children)))))
+
+    async def scrape_department(
+        self, href: str, path: list[int], continue_from: Optional[list[int]], dept_name: str
+    ) -> int:
+        """Scrape one top-level department into a part file and return its index."""
+        with PartWriter(self.state_abb, path) as part_fp:
+            try:
+                await self.scrape_branch(f"{self.site_url}{href}", path, continue_from, part_fp.write)
+            except Exception as e:
+                print(f"ERROR: Department {dept_name} failed: {e}")
+                log_failed_branch(self.state_abb, self.log_lock, f"{self.site_url}{href}", path, e)
+        return path[0]
+
 
-        # Update department progress bar description
-        if dept_pbar:
-            dept_pbar.set_description(f"Department: {dept_name}")
-
-        scrape_branch(
-            url=f"{site_url}{href}",
-            path=path,
-            continue_from=continue_from,
-            state_name=state_name,
-            state_abb=state_abb,
-            jsonl_fp=jsonl_fp,
-            site_url=site_url,
-            internal_class=internal_class,
-            lock=lock,
-            visited_urls=visited_urls,
+async def scrape_departments_async(
+    departments: list,
+    sync_session,
+    state_abb: str,
+    merger: DepartmentMerger,
+    site_url: str,
+    internal_class: str,
+    visited_urls: dict,
+    pbar: Optional[tqdm] = None,
+    dept_pbar: Optional[tqdm] = None,
+    max_retries: int = 3,
+    limit_per_host: int = ASYNC_LIMIT_PER_HOST,
+    http2: bool = False,
+) -> None:
+    """
+    Scrape departments with the asyncio crawler.
+
+    The aiohttp session (or httpx client, with http2) reuses the headers and cookies of
+    the synchronous session, which has already fetched the state index page (solving
+    any Cloudflare challenge), so the challenge is only paid once.
+
+    Args:
+        departments (list): (href, path, continue_from, dept_name) tuples to scrape
+        sync_session: The primed cloudscraper/requests/httpx session
+        state_abb (str): State abbreviation
+        merger (DepartmentMerger): Merges each finished department's part file into the output
+        site_url (str): Base URL the relative links are resolved against
+        internal_class (str): CSS class of the element holding the navigation links
+        visited_urls (dict): URLs already visited (see mark_visited)
+        pbar (tqdm): Progress bar for pages
+        dept_pbar (tqdm): Progress bar for departments
+        max_retries (int): Maximum retry attempts for failed requests
+        limit_per_host (int): Open connections to Justia; each may carry
+            ASYNC_REQUESTS_PER_CONNECTION in-flight requests
+        http2 (bool): Multiplex the requests over HTTP/2 with httpx instead of aiohttp
+    """
+    concurrency = limit_per_host * ASYNC_REQUESTS_PER_CONNECTION
+    cookies = {cookie.name: cookie.value for cookie in getattr(sync_session.cookies, "jar", sync_session.cookies)}
+    if http2:
+        # Requests are multiplexed as streams, so these connections carry every in-flight request
+        session = httpx.AsyncClient(
+            http2=True,
+            headers=dict(sync_session.headers),
+            cookies=cookies,
+            limits=httpx.Limits(max_connections=limit_per_host, max_keepalive_connections=limit_per_host),
+            timeout=30,
+            follow_redirects=True,
+        )
+    else:
+        connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=limit_per_host, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers=dict(sync_session.headers),
+            cookies=cookies,
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    async with session:
+        crawler = AsyncCrawler(
+            session,
+            state_abb,
+            site_url,
+            internal_class,
+            visited_urls,
             pbar=pbar,
-            dept_pbar=dept_pbar,
             max_retries=max_retries,
-            scraper=scraper,
+            concurrency=concurrency,
         )
-
-        # Update department progress bar when department is complete
-        if dept_pbar:
-            with lock:
+        tasks = [asyncio.create_task(crawler.scrape_department(*department)) for department in departments]
+        # The crawler writes each department's part in lex_path order, so merging in
+        # department order keeps the output ordered however the departments finish
+        loop = asyncio.get_running_loop()
+        for task in asyncio.as_completed(tasks):
+            # Merging copies (and, with --gzip, compresses) a whole department; do it on
+            # the executor so the other departments' fetches keep going
+            await loop.run_in_executor(None, merger.finish, await task)
+            if dept_pbar is not None:
                 dept_pbar.update(1)
 
-        work_queue.task_done()
-
 
 def collect_regulations_for_state(
     state_abb: str,
     resume: bool = False,
     num_threads: int = 1,
     max_retries: int = 3,
+    use_cache: bool = False,
+    use_http2: bool = False,
+    use_async: bool = False,
+    rps: Optional[float] = None,
+    compress: bool = False,
 ) -> None:
     """
     Collect all regulations for the given state in parallel.
@@ -677,63 +2103,119 @@ def collect_regulations_for_state(
     Args:
         state_abb (str): State abbreviation (e.g., 'MT')
         resume (bool): Whether to resume from last scraped position
-        num_threads (int): Number of worker threads
+        num_threads (int): Number of worker threads in the pool
         max_retries (int): Maximum retry attempts for failed requests
+        use_cache (bool): Whether to reuse pages from (and save pages to) the on-disk cache
+        use_http2 (bool): Whether to fetch over HTTP/2 with httpx instead of cloudscraper/requests
+        use_async (bool): Whether to crawl with asyncio + aiohttp instead of the thread pool
+        rps (float | None): Maximum requests per second across all workers (0 for no limit;
+            None for DEFAULT_RPS_PER_THREAD per thread, or per --threads connection with use_async)
+        compress (bool): Whether to write gzip-compressed output (regs/{STATE}.jsonl.gz)
     """
-    if state_abb not in JUR_URL_MAP:
+    if state_abb not in _STATE_CODES:
         print(f"ERROR: State '{state_abb}' not found in JUR_URL_MAP")
         return
 
     state_name = JUR_URL_MAP[state_abb]
     state_init_url = f"{REGULATIONS_BASE_URL}/states/{state_name}/"
-    save_dir = "regs"
+    save_path = get_output_path(state_abb, compress)
     site_base_url = REGULATIONS_BASE_URL
     internal_class = "codes-listing"
 
-    if not os.path.exists(save_dir):
-        os.makedirs(save_dir)
+    if not os.path.exists(SAVE_DIR):
+        os.makedirs(SAVE_DIR)
 
     continue_from = None
     mode = "w"
+    parts_dir = f"{SAVE_DIR}/{state_abb}.parts"
+    resume_parts = False
     if resume:
-        continue_from = get_last_lex_path(state_abb)
-        if continue_from is not None:
+        if compress:
+            # The repair pass already decompresses up to the last record, so its lex_path
+            # is taken from there rather than from another pass in get_last_lex_path
+            last_line = repair_compressed_output(save_path)
+            continue_from = loads_record(last_line).get("lex_path") if last_line else None
+        else:
+            drop_partial_record(save_path)
+            continue_from = get_last_lex_path(state_abb)
+        # Part files mean the output holds whole departments only; the interrupted
+        # ones are resumed from their parts instead of from the output's last line
+        resume_parts = os.path.isdir(parts_dir)
+        if resume_parts and continue_from is not None and list_part_files(state_abb, continue_from[0]):
+            # The run was killed while merging the department holding the last saved
+            # record (its parts are only deleted once it is merged in full); finish
+            # that merge, skipping the records that already made it into the output
+            print(f"Finishing the interrupted merge of department {continue_from[0]}")
+            with open_output(save_path, "ab") as out_fp:
+                merge_department_parts(state_abb, continue_from[0], out_fp, after=continue_from)
+        if continue_from is not None or resume_parts:
             mode = "a"
             print(f"Resuming from lex_path: {continue_from}")
+    if mode == "w":
+        # Parts from an older run would be merged into the fresh output
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    if use_http2 and not (USE_HTTPX and USE_H2):
+        missing = "httpx" if not USE_HTTPX else "h2 (httpx's HTTP/2 support)"
+        print(f"WARNING: {missing} not installed. Install it with: pip install 'httpx[http2]'")
+        use_http2 = False
+
+    # With --http2 the async crawler uses httpx's AsyncClient and doesn't need aiohttp
+    if use_async and not USE_AIOHTTP and not use_http2:
+        print("WARNING: aiohttp not installed. Install it with: pip install aiohttp")
+        print("WARNING: Falling back to the thread pool\n")
+        use_async = False
 
     print(f"\nStarting scraper for {state_abb} ({state_name})")
     print(f"Base URL: {state_init_url}")
-    print(f"Using {num_threads} threads")
+    # In async mode --threads sizes the connection pool instead of a thread pool
+    async_limit_per_host = num_threads if num_threads > 1 else ASYNC_LIMIT_PER_HOST
+    if use_async:
+        print(
+            f"Using asyncio with up to {async_limit_per_host * ASYNC_REQUESTS_PER_CONNECTION} "
+            f"concurrent requests over {async_limit_per_host} connections"
+        )
+    else:
+        print(f"Using {num_threads} threads")
     print(f"Max retries: {max_retries}")
-
-    # Create a shared scraper instance
-    if USE_CLOUDSCRAPER:
+    if rps is None:
+        # Keep the crawl at the pace of the old per-request pause; with --async, --threads
+        # counts connections, so the same number bounds its rate
+        rps = DEFAULT_RPS_PER_THREAD * num_threads
+    set_rate_limit(rps)
+    if rps:
+        print(f"Rate limit: {rps} requests/second")
+    if use_cache:
+        enable_page_cache()
+        print(f"Caching pages in: {CACHE_DIR}/")
+
+    # Use the shared pooled session, sized so every thread can hold a connection
+    if use_http2:
+        print(f"Using httpx over HTTP/2 (does not solve Cloudflare challenges)\n")
+    elif USE_CLOUDSCRAPER:
         print(f"Using cloudscraper to bypass Cloudflare protection\n")
-        scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'darwin',
-                'desktop': True
-            }
-        )
     else:
         print(f"WARNING: Using basic requests (may not work with Cloudflare)\n")
-        scraper = None
+    scraper = get_session(pool_maxsize=max(POOL_MAXSIZE, num_threads), http2=use_http2)
 
-    with open(f"{save_dir}/{state_abb}.jsonl", mode) as f:
+    with open_output(save_path, mode + "b") as f:
+        # Fetching the index before any worker starts primes the shared session: cloudscraper
+        # solves the Cloudflare challenge once here and every worker reuses the cookies
         response = fetch_with_retry(state_init_url, max_retries=max_retries, scraper=scraper)
         if not response or response.status_code != 200:
             print(f"Failed to get initial page for {state_abb}")
             return
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        internal_links_element = soup.find(class_=internal_class)
-        if not internal_links_element:
+        # Justia's HTML compresses around 8-10x, so an uncompressed reply (e.g. from a proxy
+        # stripping Accept-Encoding) multiplies the bytes every page costs
+        if not getattr(response, "from_cache", False) and not response.headers.get("Content-Encoding"):
+            print("WARNING: Server sent the index page uncompressed; pages will be downloaded uncompressed\n")
+
+        links = extract_listing_links(response.content, internal_class)
+        if links is None:
             print(f"No departments found for {state_abb}")
             return
 
-        links = extract_links_from_content(internal_links_element)
-
         # Filter out RESERVED and REPEALED departments
         original_count = len(links)
         links = [link for link in links if not is_reserved_or_repealed(link["text"])]
@@ -744,14 +2226,23 @@ def collect_regulations_for_state(
             print(f"Skipped {filtered_count} RESERVED/REPEALED departments")
         print()
 
-        work_queue = queue.Queue()
         file_lock = threading.Lock()
-        visited_urls = set()  # Track visited URLs to prevent circular references
+        visited_urls = {}  # Track visited URLs to prevent circular references
+        if mode == "a":
+            # Pages saved by the interrupted run may be reached again through a
+            # cross-reference from a later branch; don't fetch them twice
+            visited_urls = dict.fromkeys(load_scraped_urls(state_abb, compress), True)
+            print(f"Skipping {len(visited_urls)} already scraped pages")
 
         start_branch_idx = 0
-        if continue_from:
+        if resume_parts:
+            # The department holding the last saved record has now been merged in full
+            start_branch_idx = continue_from[0] + 1 if continue_from else 0
+            continue_from = None
+        elif continue_from:
             start_branch_idx = continue_from[0]
 
+        departments = []
         for i, link in enumerate(links):
             if i < start_branch_idx:
                 continue
@@ -760,44 +2251,86 @@ def collect_regulations_for_state(
             if i == start_branch_idx and continue_from:
                 branch_continue_from = continue_from
 
-            work_queue.put((link["href"], [i], branch_continue_from, link["text"]))
-
-        threads = []
-
-        # Create two progress bars: pages and departments
-        pbar_pages = tqdm(desc=f"Scraping pages", unit=" pages", position=0)
+            part_paths = list_part_files(state_abb, i) if resume_parts else []
+            if part_paths:
+                # Each part is in lex_path order, but with threads a department's branches
+                # may have been split between several parts, so there is no single position
+                # to resume after; skip its saved pages instead (with --async too)
+                part_urls = set()
+                for part_path in part_paths:
+                    part_urls |= recover_part_file(part_path)
+                visited_urls.update(dict.fromkeys(part_urls, True))
+                print(f"Resuming {link['text']} after {len(part_urls)} saved pages")
+
+            os.makedirs(os.path.dirname(get_part_path(state_abb, [i])), exist_ok=True)
+            departments.append((link["href"], [i], branch_continue_from, link["text"]))
+
+        merger = DepartmentMerger(state_abb, f, [path[0] for _, path, _, _ in departments])
+
+        # Create two progress bars: pages and departments. The page bar is
+        # ticked once per leaf from every worker, so throttle its repaints
+        # (at most twice a second) and smooth the rate over a longer window.
+        pbar_pages = tqdm(desc=f"Scraping pages", unit=" pages", position=0,
+                          mininterval=0.5, smoothing=0.1)
         pbar_depts = tqdm(total=len(links), desc=f"Departments", unit=" dept", position=1)
 
-        for _ in range(num_threads):
-            thread = threading.Thread(
-                target=worker,
-                args=(
-                    work_queue,
-                    state_name,
+        if use_async:
+            asyncio.run(
+                scrape_departments_async(
+                    departments,
+                    scraper,
                     state_abb,
-                    f,
+                    merger,
                     site_base_url,
                     internal_class,
-                    file_lock,
                     visited_urls,
                     pbar_pages,
                     pbar_depts,
                     max_retries,
-                    scraper,
-                ),
+                    limit_per_host=async_limit_per_host,
+                    http2=use_http2,
+                )
             )
-            thread.start()
-            threads.append(thread)
+        else:
+            # One task per department on a fixed-size pool; the pool's own queue hands
+            # departments to idle threads, and branches too once departments run out
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                scheduler = BranchScheduler(executor, num_threads)
+                for href, path, branch_continue_from, dept_name in departments:
+                    scheduler.submit(
+                        path[0],
+                        scrape_department,
+                        href,
+                        path,
+                        branch_continue_from,
+                        dept_name,
+                        state_name,
+                        state_abb,
+                        site_base_url,
+                        internal_class,
+                        file_lock,
+                        visited_urls,
+                        pbar_pages,
+                        pbar_depts,
+                        max_retries,
+                        scraper,
+                        scheduler,
+                    )
 
-        for thread in threads:
-            thread.join()
+                # Each part file is written in lex_path order; merging finished departments
+                # in department order keeps the whole output in lex_path order however the
+                # threads finish
+                for _ in departments:
+                    merger.finish(scheduler.finished.get())
+                    pbar_depts.update(1)
+        shutil.rmtree(parts_dir, ignore_errors=True)
 
         pbar_pages.close()
         pbar_depts.close()
 
         # Summary
         print(f"\nScraping completed for {state_abb}!")
-        print(f"Output saved to: {save_dir}/{state_abb}.jsonl")
+        print(f"Output saved to: {save_path}")
         failed_file = f"failed_{state_abb}.txt"
         if os.path.exists(failed_file):
             print(f"Check {failed_file} for any URLs that couldn't be processed")
@@ -812,9 +2345,9 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "state",
-        type=str,
-        help="The state abbreviation to scrape (e.g., MT for Montana).",
-        choices=JUR_URL_MAP.keys()
+        type=parse_state,
+        help="The state abbreviation (or URL name, e.g. montana) to scrape (e.g., MT for Montana).",
+        metavar="STATE",
     )
     parser.add_argument(
         "-c",
@@ -825,9 +2358,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "-t",
         "--threads",
+        "--workers",
+        dest="threads",
         type=int,
         default=1,
-        help="The number of threads to use (default: 2).",
+        help="The number of threads to use (default: 1). With --async, the number of "
+        f"connections to open (default: {ASYNC_LIMIT_PER_HOST}).",
     )
     parser.add_argument(
         "--max-retries",
@@ -835,11 +2371,47 @@ if __name__ == "__main__":
         default=3,
         help="Maximum number of retry attempts for failed requests (default: 3).",
     )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=None,
+        help=f"Maximum requests per second shared by all threads; 0 for no limit "
+        f"(default: {DEFAULT_RPS_PER_THREAD} per thread; with --async, per --threads connection count).",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache fetched pages on disk (.justia_cache/) and reuse them for 7 days.",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Fetch over HTTP/2 with httpx, multiplexing requests on one connection (requires httpx[http2]).",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Crawl with asyncio + aiohttp instead of threads (requires aiohttp).",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write gzip-compressed output to regs/{STATE}.jsonl.gz.",
+    )
     args_ = parser.parse_args()
 
-    collect_regulations_for_state(
-        args_.state,
-        resume=args_.resume,
-        num_threads=args_.threads,
-        max_retries=args_.max_retries,
-    )
+    try:
+        collect_regulations_for_state(
+            args_.state,
+            resume=args_.resume,
+            num_threads=args_.threads,
+            max_retries=args_.max_retries,
+            use_cache=args_.cache,
+            use_http2=args_.http2,
+            use_async=args_.use_async,
+            rps=args_.rps,
+            compress=args_.gzip,
+        )
+    finally:
+        close_session()
@@ -17,26 +17,48 @@ Usage:
 """
 
 import argparse
-import json
 import os
+import queue
 import random
+import re
 import sys
-import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter, le
 from typing import List, Dict, Optional, Set, Tuple
 
-import cloudscraper
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 # Import from parent directory
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from regscraper import (
-    extract_links_from_content,
+    create_session,
+    extract_listing_links,
     fetch_with_retry,
+    is_malformed_href,
     is_reserved_or_repealed,
+    loads_record,
+    open_output,
+    set_rate_limit,
+    HTML_PARSER,
     JUR_URL_MAP,
+    POOL_MAXSIZE,
 )
 
+# Worker threads walking each section's tree
+DEFAULT_THREADS = 8
+# Spot-check fetches in flight at once, to stay polite to the server
+SPOT_CHECK_WORKERS = 5
+# Requests/second to Justia shared by all threads when --rps is not given; fixed
+# whatever --threads is, and no faster than the old sequential walk
+DEFAULT_RPS = 5
+
+_WS_RE = re.compile(r"\s+")
+# Text that marks a sibling div as a continuation of the regulation
+_CONTENT_KEYWORDS = frozenset({"Section", "subsection", "Rule", "Chapter"})
+
 
 # ============================================================================
 # Section-by-Section Validation
@@ -54,14 +76,12 @@ def get_top_level_sections(base_url: str, internal_class: str, scraper) -> List[
         print(f"✗ Failed to fetch base URL: {base_url}")
         return []
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    nav_element = soup.find(class_=internal_class)
-
-    if not nav_element:
+    # Same parser as the scraper: selectolax when installed, else a strained BeautifulSoup parse
+    links = extract_listing_links(response.content, internal_class)
+    if links is None:
         print(f"✗ No navigation found at {base_url}")
         return []
 
-    links = extract_links_from_content(nav_element)
     sections = []
 
     for i, link in enumerate(links):
@@ -69,7 +89,7 @@ def get_top_level_sections(base_url: str, internal_class: str, scraper) -> List[
             continue
 
         href = link["href"]
-        if href.endswith("//") or "//" in href.replace("://", ""):
+        if is_malformed_href(href):
             continue
 
         section_url = f"https://regulations.justia.com{href}"
@@ -85,50 +105,101 @@ def get_top_level_sections(base_url: str, internal_class: str, scraper) -> List[
     return sections
 
 
-def walk_section(section_url: str, section_path: List[int], internal_class: str, scraper, max_depth: int = 20) -> List[str]:
+class FetchFailed(Exception):
+    """A page could not be fetched (raised so fetch_nav_links doesn't cache the failure)."""
+
+
+@lru_cache(maxsize=10000)
+def fetch_nav_links(url: str, internal_class: str, scraper) -> Optional[Tuple[Tuple[str, str], ...]]:
+    """
+    Fetch a page and get its navigation links, remembering the result per URL.
+
+    Pages reached again (from another section or through a cross-reference) are not
+    fetched a second time.
+
+    Returns:
+        Tuple of (text, href) pairs, or None for a leaf page (a page without a navigation
+        element; an empty one is a branch with no children, as in the scraper)
+
+    Raises:
+        FetchFailed: If the page could not be fetched
+    """
+    response = fetch_with_retry(url, max_retries=3, scraper=scraper)
+    if not response or response.status_code != 200:
+        raise FetchFailed(url)
+
+    # Classified exactly as the scraper does, so the expected URLs match what it scrapes
+    links = extract_listing_links(response.content, internal_class)
+    if links is None:
+        return None
+    return tuple((link["text"], link["href"]) for link in links)
+
+
+def walk_section(
+    section_url: str,
+    section_path: List[int],
+    internal_class: str,
+    scraper,
+    max_depth: int = 20,
+    max_workers: int = DEFAULT_THREADS,
+) -> List[str]:
     """
     Walk a single top-level section to get all regulation URLs.
 
+    Pages are fetched on a thread pool: each finished branch page submits its children,
+    so up to max_workers requests are in flight (paced by the shared rate limiter).
+
     Returns:
-        List of regulation URLs in this section
+        List of regulation URLs in this section, in lex_path order
     """
-    urls = []
+    leaves = []  # (path, url); list.append is atomic, so workers share it without a lock
 
-    def _walk(url: str, path: List[int], depth: int = 0):
+    def _visit(url: str, path: List[int], depth: int) -> List[Tuple[str, List[int], int]]:
+        """Fetch one page; return its children to visit (none for a leaf)."""
         if depth >= max_depth:
-            return
+            return []
 
-        response = fetch_with_retry(url, max_retries=3, scraper=scraper)
-        if not response or response.status_code != 200:
-            return
+        try:
+            links = fetch_nav_links(url, internal_class, scraper)
+        except FetchFailed:
+            return []
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        nav_element = soup.find(class_=internal_class)
+        if links is None:
+            # Leaf node - actual regulation
+            leaves.append((path, url))
+            return []
 
-        if nav_element:
-            # Branch node - recurse
-            links = extract_links_from_content(nav_element)
+        # Branch node - visit the children
+        children = []
+        for i, (text, href) in enumerate(links):
+            if is_reserved_or_repealed(text):
+                continue
 
-            for i, link in enumerate(links):
-                if is_reserved_or_repealed(link["text"]):
-                    continue
+            if is_malformed_href(href):
+                continue
 
-                href = link["href"]
-                if href.endswith("//") or "//" in href.replace("://", ""):
-                    continue
+            child_url = f"https://regulations.justia.com{href}"
+            if not child_url.endswith('/'):
+                child_url += '/'
 
-                child_url = f"https://regulations.justia.com{href}"
-                if not child_url.endswith('/'):
-                    child_url += '/'
+            children.append((child_url, path + [i], depth + 1))
+        return children
 
-                _walk(child_url, path + [i], depth + 1)
-                time.sleep(0.05)  # Faster delay
-        else:
-            # Leaf node - actual regulation
-            urls.append(url)
+    # Finished pages arrive on a queue, so handling one costs O(1) however many are
+    # in flight (wait() on the pending set would touch every pending future each time)
+    finished = queue.SimpleQueue()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        executor.submit(_visit, section_url, section_path, 0).add_done_callback(finished.put)
+        outstanding = 1
+        while outstanding:
+            future = finished.get()
+            outstanding -= 1
+            for child in future.result():
+                executor.submit(_visit, *child).add_done_callback(finished.put)
+                outstanding += 1
 
-    _walk(section_url, section_path)
-    return urls
+    leaves.sort()
+    return [url for _, url in leaves]
 
 
 def validate_section_completeness(section_name: str, expected_urls: Set[str], actual_urls: Set[str]) -> Tuple[bool, List[str], List[str]]:
@@ -138,6 +209,11 @@ def validate_section_completeness(section_name: str, expected_urls: Set[str], ac
     Returns:
         (is_complete, missing_urls, extra_urls)
     """
+    # Common case: every expected URL is present and nothing else. Set equality checks
+    # the sizes first and builds no difference sets.
+    if expected_urls == actual_urls:
+        return True, [], []
+
     missing = sorted(expected_urls - actual_urls)
     extra = sorted(actual_urls - expected_urls)
     is_complete = len(missing) == 0
@@ -152,6 +228,11 @@ def validate_section_order(section_records: List[Dict]) -> Tuple[bool, List[str]
     Returns:
         (is_ordered, issues)
     """
+    # Fast path: almost every section is ordered, and checking that needs no Python-level loop
+    paths = list(map(itemgetter("lex_path"), section_records))
+    if all(map(le, paths, islice(paths, 1, None))):
+        return True, []
+
     issues = []
     prev_path = None
 
@@ -167,153 +248,163 @@ def validate_section_order(section_records: List[Dict]) -> Tuple[bool, List[str]
     return len(issues) == 0, issues
 
 
-def spot_check_section_content(section_records: List[Dict], scraper, num_samples: int = 10) -> Tuple[int, int, List[str]]:
+def normalize(text: str) -> str:
+    """Normalize text for comparison - remove all whitespace and lowercase it."""
+    return _WS_RE.sub("", text).lower()
+
+
+def collect_content_divs(main_content: Tag) -> List[Tag]:
     """
-    Spot-check a few records in this section for content.
+    Collect main-content and the sibling divs that continue it (same logic as scraper).
+
+    Args:
+        main_content: The page's #main-content element
 
     Returns:
-        (passed, failed, failure_details)
+        main_content followed by its continuation divs, in page order
     """
-    if not section_records:
-        return 0, 0, []
-
-    # Sample up to num_samples records
-    sample_size = min(num_samples, len(section_records))
-    samples = random.sample(section_records, sample_size)
+    collected_divs = [main_content]
+    for next_sibling in main_content.next_siblings:
+        if not isinstance(next_sibling, Tag) or next_sibling.name != "div":
+            continue
+        classes = next_sibling.get("class", [])
+        cls_joined = " ".join(classes).lower()
+
+        # Stop at disclaimer or footer; the class checks need no text extraction
+        if "disclaimer" in classes or "notification" in cls_joined or "footer" in cls_joined:
+            break
+        text_preview = next_sibling.get_text(strip=True)[:100]
+        if "Disclaimer" in text_preview:
+            break
+
+        # Collect content-indent divs and divs that look like regulation content
+        if "content-indent" in classes or any(keyword in text_preview for keyword in _CONTENT_KEYWORDS):
+            collected_divs.append(next_sibling)
+        else:
+            break
 
-    passed = 0
-    failed = 0
-    failure_details = []
+    return collected_divs
 
-    for record in samples:
-        url = record["url"]
-        stored_content = record.get("content", "")
 
-        # Quick check: Is there substantial content stored?
-        if len(stored_content) < 50:
-            failed += 1
-            failure_details.append(f"     {url} - Content too short ({len(stored_content)} chars)")
-            continue
+def check_record_content(record: Dict, scraper) -> Optional[str]:
+    """
+    Compare one record's stored content with its live page.
 
-        # Fetch and compare
-        response = fetch_with_retry(url, max_retries=2, scraper=scraper)
-        if not response or response.status_code != 200:
-            failed += 1
-            failure_details.append(f"     {url} - Failed to fetch (HTTP {response.status_code if response else 'timeout'})")
-            continue
+    Returns:
+        None if the content matches, otherwise the failure detail line
+    """
+    url = record["url"]
+    stored_content = record.get("content", "")
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        main_content = soup.find(id="main-content")
+    # Quick check: Is there substantial content stored?
+    if len(stored_content) < 50:
+        return f"     {url} - Content too short ({len(stored_content)} chars)"
 
-        if not main_content:
-            failed += 1
-            failure_details.append(f"     {url} - No main-content found on page")
-            continue
+    # Fetch and compare
+    response = fetch_with_retry(url, max_retries=2, scraper=scraper)
+    if not response or response.status_code != 200:
+        return f"     {url} - Failed to fetch (HTTP {response.status_code if response else 'timeout'})"
+
+    soup = BeautifulSoup(response.content, HTML_PARSER)
+    main_content = soup.find(id="main-content")
+
+    if not main_content:
+        return f"     {url} - No main-content found on page"
+
+    collected_divs = collect_content_divs(main_content)
+
+    # Combine the text of all collected divs and normalize both for comparison
+    page_normalized = normalize("".join(div.get_text() for div in collected_divs))
+    stored_normalized = normalize(stored_content)
+
+    # Strategy: Check if multiple chunks of stored content exist ANYWHERE on page
+    # Page may have promotional junk interspersed that we removed during scraping
+    # We sample chunks from different positions and check if they all appear on page
+
+    chunks_to_check = []
+
+    if len(stored_normalized) <= 500:
+        # Short content - just check if 80% of it exists on page
+        if stored_normalized in page_normalized:
+            return None
+        # Try checking if most of the stored content appears, stopping once enough does
+        match_len = 0
+        chunk_size = 50
+        required_len = len(stored_normalized) * 0.8
+        for i in range(0, len(stored_normalized) - chunk_size, chunk_size):
+            if stored_normalized[i:i+chunk_size] in page_normalized:
+                match_len += chunk_size
+                if match_len >= required_len:
+                    return None
+        if match_len >= required_len:
+            return None
+        return f"     {url} - Content mismatch (only {match_len}/{len(stored_normalized)} chars matched)"
+
+    # For longer content, sample many small chunks from different positions
+    # Smaller chunks are more likely to match despite minor HTML differences
+    num_chunks = 20
+    chunk_size = 100  # Smaller chunks more forgiving
+    step = (len(stored_normalized) - chunk_size) // (num_chunks - 1) if num_chunks > 1 else 0
+
+    for i in range(num_chunks):
+        start = i * step
+        if start + chunk_size <= len(stored_normalized):
+            chunks_to_check.append(stored_normalized[start:start + chunk_size])
+
+    # Require at least 60% of chunks to pass (lenient - accounts for page variations)
+    required = max(1, int(len(chunks_to_check) * 0.6))
+
+    # Count how many chunks are found on the page, stopping as soon as enough are.
+    # Each check is one C-level substring search, which beats building a multi-pattern
+    # automaton for 20 patterns
+    found = 0
+    for chunk in chunks_to_check:
+        if chunk in page_normalized:
+            found += 1
+            if found >= required:
+                return None
+    return f"     {url} - Content mismatch (only {found}/{len(chunks_to_check)} chunks found, need {required})"
 
-        # Collect main-content AND sibling divs (same logic as scraper)
-        collected_divs = [main_content]
-        current = main_content
-        while True:
-            next_sibling = current.find_next_sibling()
-            if not next_sibling:
-                break
-            if next_sibling.name == "div":
-                classes = next_sibling.get("class", [])
-                text_preview = next_sibling.get_text(strip=True)[:100]
-
-                # Stop at disclaimer or footer
-                if "disclaimer" in classes or "Disclaimer" in text_preview:
-                    break
-                if "notification" in str(classes).lower() or "footer" in str(classes).lower():
-                    break
-
-                # Collect content-indent divs
-                if "content-indent" in classes:
-                    collected_divs.append(next_sibling)
-                    current = next_sibling
-                elif any(keyword in text_preview for keyword in ["Section", "subsection", "Rule", "Chapter"]):
-                    collected_divs.append(next_sibling)
-                    current = next_sibling
-                else:
-                    break
-            else:
-                current = next_sibling
-
-        # Combine all collected divs
-        combined_html = BeautifulSoup("<div></div>", "html.parser")
-        container = combined_html.div
-        for div in collected_divs:
-            container.append(div)
-
-        # Normalize both for comparison - remove all whitespace
-        def normalize(text):
-            import re
-            text = re.sub(r'\s+', '', text)
-            text = text.lower()
-            return text
-
-        page_normalized = normalize(container.get_text())
-        stored_normalized = normalize(stored_content)
-
-        # Strategy: Check if multiple chunks of stored content exist ANYWHERE on page
-        # Page may have promotional junk interspersed that we removed during scraping
-        # We sample chunks from different positions and check if they all appear on page
-
-        chunks_to_check = []
-
-        if len(stored_normalized) <= 500:
-            # Short content - just check if 80% of it exists on page
-            if stored_normalized in page_normalized:
-                passed += 1
-                continue
-            # Try checking if most of the stored content appears
-            match_len = 0
-            chunk_size = 50
-            for i in range(0, len(stored_normalized) - chunk_size, chunk_size):
-                if stored_normalized[i:i+chunk_size] in page_normalized:
-                    match_len += chunk_size
-            if match_len >= len(stored_normalized) * 0.8:
-                passed += 1
-                continue
-            else:
-                failed += 1
-                failure_details.append(f"     {url} - Content mismatch (only {match_len}/{len(stored_normalized)} chars matched)")
-                continue
 
-        # For longer content, sample many small chunks from different positions
-        # Smaller chunks are more likely to match despite minor HTML differences
-        num_chunks = 20
-        chunk_size = 100  # Smaller chunks more forgiving
-        step = (len(stored_normalized) - chunk_size) // (num_chunks - 1) if num_chunks > 1 else 0
+def spot_check_section_content(section_records: List[Dict], scraper, num_samples: int = 10) -> Tuple[int, int, List[str]]:
+    """
+    Spot-check a few records in this section for content.
 
-        for i in range(num_chunks):
-            start = i * step
-            if start + chunk_size <= len(stored_normalized):
-                chunks_to_check.append(stored_normalized[start:start + chunk_size])
+    The sampled pages are fetched concurrently on a small thread pool.
 
-        # Count how many chunks are found on the page
-        found = sum(1 for chunk in chunks_to_check if chunk in page_normalized)
+    Returns:
+        (passed, failed, failure_details)
+    """
+    if not section_records:
+        return 0, 0, []
 
-        # Require at least 60% of chunks to pass (lenient - accounts for page variations)
-        required = max(1, int(len(chunks_to_check) * 0.6))
-        if found >= required:
-            passed += 1
-        else:
-            failed += 1
-            failure_details.append(f"     {url} - Content mismatch (only {found}/{len(chunks_to_check)} chunks found, need {required})")
+    # Sample up to num_samples records
+    sample_size = min(num_samples, len(section_records))
+    samples = random.sample(section_records, sample_size)
 
-        time.sleep(0.1)
+    # map() yields results in sample order, so the report doesn't depend on fetch timing
+    with ThreadPoolExecutor(max_workers=SPOT_CHECK_WORKERS) as executor:
+        results = list(executor.map(lambda record: check_record_content(record, scraper), samples))
 
-    return passed, failed, failure_details
+    failure_details = [detail for detail in results if detail is not None]
+    failed = len(failure_details)
+    return sample_size - failed, failed, failure_details
 
 
 # ============================================================================
 # Main Validation
 # ============================================================================
 
-def validate_state(state_abb: str, jsonl_path: str):
+def validate_state(state_abb: str, jsonl_path: str, num_threads: int = DEFAULT_THREADS, rps: Optional[float] = None):
     """
     Validate a state file section by section.
+
+    Args:
+        state_abb: State abbreviation
+        jsonl_path: The scraped JSONL (or .jsonl.gz) file
+        num_threads: Worker threads walking each section
+        rps: Maximum requests per second shared by all threads (0 for no limit;
+            None for DEFAULT_RPS)
     """
     print(f"\n{'='*80}")
     print(f"Validating {state_abb} Regulations (Section by Section)")
@@ -328,14 +419,13 @@ def validate_state(state_abb: str, jsonl_path: str):
     base_url = f"https://regulations.justia.com/states/{state_name_lower}/"
     internal_class = "codes-listing"
 
-    # Create scraper
-    scraper = cloudscraper.create_scraper(
-        browser={
-            'browser': 'chrome',
-            'platform': 'darwin',
-            'desktop': True
-        }
-    )
+    if rps is None:
+        rps = DEFAULT_RPS
+    set_rate_limit(rps)
+
+    # One keep-alive session shared by every walk and spot-check thread; its pool must be
+    # at least as large as the thread count so no worker waits on (or reopens) a connection
+    scraper = create_session(pool_maxsize=max(POOL_MAXSIZE, num_threads, SPOT_CHECK_WORKERS))
 
     # Load actual records from file
     print(f"📂 Loading {jsonl_path}...")
@@ -343,20 +433,21 @@ def validate_state(state_abb: str, jsonl_path: str):
         print(f"✗ ERROR: File not found")
         sys.exit(1)
 
-    all_records = []
-    with open(jsonl_path, 'r', encoding='utf-8') as f:
+    # Group records by top-level section (first element of lex_path) as they are read,
+    # without holding a second list of every record
+    records_by_section = defaultdict(list)
+    num_records = 0
+    with open_output(jsonl_path) as f:
         for line in f:
-            if line.strip():
-                all_records.append(json.loads(line))
-
-    print(f"  ✓ Loaded {len(all_records)} records\n")
+            # loads_record parses the raw bytes with orjson when it is installed
+            if line.isspace():
+                continue
+            record = loads_record(line)
+            num_records += 1
+            if record["lex_path"]:
+                records_by_section[record["lex_path"][0]].append(record)
 
-    # Group records by top-level section (first element of lex_path)
-    records_by_section = defaultdict(list)
-    for record in all_records:
-        if record["lex_path"]:
-            section_idx = record["lex_path"][0]
-            records_by_section[section_idx].append(record)
+    print(f"  ✓ Loaded {num_records} records\n")
 
     # Get top-level sections from website
     print(f"🌐 Getting top-level sections from website...")
@@ -385,7 +476,7 @@ def validate_state(state_abb: str, jsonl_path: str):
 
         # Get expected URLs for this section
         print(f"   Walking section tree...", end=" ", flush=True)
-        expected_urls = walk_section(section["url"], [section_idx], internal_class, scraper)
+        expected_urls = walk_section(section["url"], [section_idx], internal_class, scraper, max_workers=num_threads)
         print(f"found {len(expected_urls)} expected records")
 
         # Get actual records for this section
@@ -489,16 +580,32 @@ def main():
         type=str,
         help="State abbreviation (e.g., MT, VT)"
     )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        default=DEFAULT_THREADS,
+        help=f"Number of threads walking each section (default: {DEFAULT_THREADS})"
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=None,
+        help=f"Maximum requests per second shared by all threads; 0 for no limit "
+        f"(default: {DEFAULT_RPS}, whatever --threads is)"
+    )
     args = parser.parse_args()
 
     state_abb = args.state.upper()
     jsonl_path = f"{state_abb}.jsonl"
+    if not os.path.exists(jsonl_path) and os.path.exists(f"{jsonl_path}.gz"):
+        jsonl_path = f"{jsonl_path}.gz"  # written with regscraper.py --gzip
 
     if not os.path.exists(jsonl_path):
         print(f"ERROR: Could not find {jsonl_path} in current directory")
         sys.exit(1)
 
-    validate_state(state_abb, jsonl_path)
+    validate_state(state_abb, jsonl_path, num_threads=args.threads, rps=args.rps)
 
 
 if __name__ == "__main__":